@@ -16,23 +16,24 @@ import datetime
 import sys
 import traceback
 
+from course_schema import apply_course_schema, format_memory, schema_memory_report, summary_scores
+from diagnostics import get_logger
+from group_ttest import MIN_GROUP_SIZE, group_pairs, group_statistics, pairwise_ttests
+from data_loader import cached_read, find_sidecar, read_csv_sniffed, read_table, sniff_csv
+from progress_channel import ProgressChannel
+from student_metrics import (
+    ELECTIVE_MEAN_COLUMN, GAP_COLUMN, GPA_COLUMN, LIBERAL_COLUMNS, MAJOR_COLUMNS, MAX_SCORE_COLUMN, MIN_SCORE_COLUMN,
+    REQUIRED_MEAN_COLUMN, VALID_COUNT_COLUMN, row_mean, student_metrics,
+)
+
 # 檢查並處理Excel支援
 try:
     import openpyxl
 except ImportError:
     openpyxl = None
 
-# 設定日誌系統
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler(f'ttest_debug_{datetime.datetime.now().strftime("%Y%m%d")}.log', encoding='utf-8')
-    ]
-)
-
-logger = logging.getLogger(__name__)
+# 設定日誌系統：終端機與記錄檔由背景執行緒寫入；DEBUG 訊息預設關閉，可用環境變數 AH_DEBUG_LEVEL=2 開啟
+logger = get_logger(__name__, log_file=f'ttest_debug_{datetime.datetime.now().strftime("%Y%m%d")}.log')
 
 class TTestAnalyzer:
     def __init__(self, root):
@@ -55,7 +56,7 @@ class TTestAnalyzer:
         
         # 設定視窗位置和大小
         self.root.geometry(f'{window_width}x{window_height}+{center_x}+{center_y}')
-        logger.debug(f"視窗大小設定為 {window_width}x{window_height}，位置 ({center_x}, {center_y})")
+        logger.debug("視窗大小設定為 %sx%s，位置 (%s, %s)", window_width, window_height, center_x, center_y)
         
         # 資料變數
         self.data = None
@@ -64,6 +65,8 @@ class TTestAnalyzer:
         self.progress_window = None
         self.progress_var = None
         self.progress_label_var = None
+        # 分析在主執行緒執行，進度視窗每個畫格最多重繪一次
+        self.progress_channel = ProgressChannel(self.root)
         
         # 建立主要介面
         self.create_widgets()
@@ -71,7 +74,7 @@ class TTestAnalyzer:
     
     def create_progress_window(self, title="執行中...", total_steps=100):
         """建立進度視窗"""
-        logger.debug(f"建立進度視窗: {title}, 總步驟: {total_steps}")
+        logger.debug("建立進度視窗: %s, 總步驟: %s", title, total_steps)
         
         if self.progress_window:
             self.progress_window.destroy()
@@ -120,7 +123,7 @@ class TTestAnalyzer:
         self.progress_window.update()
     
     def update_progress(self, step, message=""):
-        """更新進度"""
+        """更新進度，重繪與處理取消按鈕的事件每個畫格最多一次"""
         if self.progress_window and not self.operation_cancelled:
             self.current_step = step
             self.progress_var.set(step)
@@ -130,9 +133,9 @@ class TTestAnalyzer:
             
             if message:
                 self.progress_label_var.set(message)
-                logger.debug(f"進度更新: {percent}% - {message}")
+                logger.debug("進度更新: %s%% - %s", percent, message)
             
-            self.progress_window.update()
+            self.progress_channel.pump(self.progress_window)
     
     def close_progress_window(self):
         """關閉進度視窗"""
@@ -356,9 +359,9 @@ class TTestAnalyzer:
         default_dir = "/mnt/d/Quinn_Small_House/2025_AH/全校課程與學籍1101-1131"
         if not os.path.exists(default_dir):
             default_dir = os.getcwd()
-            logger.debug(f"預設資料夾不存在，使用當前目錄: {default_dir}")
+            logger.debug("預設資料夾不存在，使用當前目錄: %s", default_dir)
         else:
-            logger.debug(f"使用預設資料夾: {default_dir}")
+            logger.debug("使用預設資料夾: %s", default_dir)
         
         file_path = filedialog.askopenfilename(
             title="選擇資料檔案",
@@ -371,7 +374,7 @@ class TTestAnalyzer:
         )
         
         if file_path:
-            logger.info(f"選擇檔案: {file_path}")
+            logger.info("選擇檔案: %s", file_path)
             
             # 建立進度視窗
             self.create_progress_window("載入檔案中...", 5)
@@ -379,7 +382,7 @@ class TTestAnalyzer:
             try:
                 self.update_progress(1, "檢查檔案格式...")
                 file_extension = os.path.splitext(file_path)[1].lower()
-                logger.debug(f"檔案副檔名: {file_extension}")
+                logger.debug("檔案副檔名: %s", file_extension)
                 
                 self.update_progress(2, "載入檔案...")
                 
@@ -389,35 +392,38 @@ class TTestAnalyzer:
                         raise ValueError("需要安裝openpyxl套件來支援Excel檔案。請執行: pip install openpyxl")
                     
                     logger.debug("載入Excel檔案")
-                    self.data = pd.read_excel(file_path)
+                    sidecar = find_sidecar(file_path)
+                    if sidecar:
+                        logger.debug("使用 Parquet 附屬檔: %s", sidecar)
+                    self.data = read_table(file_path)
                     
                 elif file_extension == '.csv':
-                    # 載入CSV檔案，嘗試不同編碼格式
-                    encodings = ['utf-8-sig', 'utf-8', 'big5', 'gbk', 'cp950']
-                    logger.debug("載入CSV檔案，嘗試不同編碼")
-                    
-                    for encoding in encodings:
-                        try:
-                            logger.debug(f"嘗試編碼: {encoding}")
-                            self.data = pd.read_csv(file_path, encoding=encoding)
-                            logger.debug(f"成功使用編碼: {encoding}")
-                            break
-                        except UnicodeDecodeError:
-                            continue
-                    else:
-                        raise ValueError("無法解碼CSV檔案，請檢查檔案編碼格式")
+                    # 載入CSV檔案，由檔案開頭判斷編碼與分隔符號後一次解析
+                    csv_format = sniff_csv(file_path)
+                    logger.debug("CSV格式: 編碼=%s, 分隔符號=%r, 略過前%d行",
+                                 csv_format.encoding, csv_format.delimiter, csv_format.header_row)
+                    self.data = cached_read(read_csv_sniffed, file_path)
                 else:
                     raise ValueError(f"不支援的檔案格式: {file_extension}")
                 
                 self.update_progress(3, "驗證資料格式...")
-                logger.info(f"成功載入檔案，資料大小: {self.data.shape}")
-                logger.debug(f"欄位名稱: {list(self.data.columns)}")
+                logger.info("成功載入檔案，資料大小: %s", self.data.shape)
+                if logger.isEnabledFor(logging.INFO):
+                    self.data, memory_before, memory_after = schema_memory_report(self.data)
+                    logger.info("記憶體用量: %s → %s", format_memory(memory_before), format_memory(memory_after))
+                else:
+                    self.data = apply_course_schema(self.data)
+                # 成績欄位統一為數值型態（沒有成績為 NaN），附屬檔已帶有格式版本時不需轉換
+                self.data = summary_scores(self.data)
+                # 總體GPA、必修/選修平均等衍生指標，02 輸出的彙整表已包含時直接使用，否則在此補算一次
+                self.data = student_metrics(self.data)
+                logger.debug("欄位名稱: %s", list(self.data.columns))
                 
                 # 檢查必要欄位
                 required_columns = ['學院', '科系', '學號', '一般必修', '一般選修', '通識必修', '通識選修']
                 missing_columns = [col for col in required_columns if col not in self.data.columns]
                 if missing_columns:
-                    logger.warning(f"缺少必要欄位: {missing_columns}")
+                    logger.warning("缺少必要欄位: %s", missing_columns)
                 
                 self.update_progress(4, "更新介面...")
                 self.file_label.config(text=f"已載入: {os.path.basename(file_path)}")
@@ -427,13 +433,13 @@ class TTestAnalyzer:
                 self.close_progress_window()
                 
                 messagebox.showinfo("成功", f"成功載入 {len(self.data)} 筆資料")
-                logger.info(f"檔案載入完成: {len(self.data)} 筆資料")
+                logger.info("檔案載入完成: %s 筆資料", len(self.data))
                 
             except Exception as e:
                 self.close_progress_window()
                 error_msg = f"載入檔案時發生錯誤: {str(e)}"
                 logger.error(error_msg)
-                logger.error(f"錯誤詳情: {traceback.format_exc()}")
+                logger.error("錯誤詳情: %s", traceback.format_exc())
                 messagebox.showerror("錯誤", error_msg)
         else:
             logger.info("用戶取消檔案選擇")
@@ -501,20 +507,10 @@ class TTestAnalyzer:
             return
         
         try:
-            # 計算所有必修和選修的平均成績
-            required_scores = []
-            elective_scores = []
-            
-            for idx, row in self.data.iterrows():
-                req_scores = [row['一般必修'], row['通識必修']]
-                elec_scores = [row['一般選修'], row['通識選修']]
-                
-                req_valid = [s for s in req_scores if pd.notna(s)]
-                elec_valid = [s for s in elec_scores if pd.notna(s)]
-                
-                if req_valid and elec_valid:
-                    required_scores.append(np.mean(req_valid))
-                    elective_scores.append(np.mean(elec_valid))
+            # 所有必修和選修的平均成績（衍生指標欄位），兩者皆有成績的學生才配對
+            paired = self.data[[REQUIRED_MEAN_COLUMN, ELECTIVE_MEAN_COLUMN]].dropna()
+            required_scores = paired[REQUIRED_MEAN_COLUMN].to_numpy()
+            elective_scores = paired[ELECTIVE_MEAN_COLUMN].to_numpy()
             
             if len(required_scores) < 2:
                 messagebox.showerror("錯誤", "有效配對資料不足")
@@ -554,32 +550,10 @@ class TTestAnalyzer:
             return
         
         try:
-            college1_data = []
-            college2_data = []
-            
-            for idx, row in self.data.iterrows():
-                # 直接使用Excel中的學院欄位
-                college = row['學院']
-                
-                # 根據課程類型取得成績
-                if course_type == "通識課程":
-                    # 通識課程取兩個通識欄位的平均
-                    scores = [row['通識必修'], row['通識選修']]
-                    valid_scores = [s for s in scores if pd.notna(s)]
-                    if valid_scores:
-                        score = np.mean(valid_scores)
-                    else:
-                        continue
-                else:
-                    score = row[course_type]
-                    if pd.isna(score):
-                        continue
-                
-                # 分配到對應學院
-                if college == college1:
-                    college1_data.append(score)
-                elif college == college2:
-                    college2_data.append(score)
+            # 根據課程類型取得成績，再依Excel中的學院欄位分配
+            scores = self._course_type_scores(course_type)
+            college1_data = scores[self.data['學院'] == college1].dropna().to_numpy()
+            college2_data = scores[self.data['學院'] == college2].dropna().to_numpy()
             
             if len(college1_data) < 2 or len(college2_data) < 2:
                 messagebox.showerror("錯誤", f"資料不足：{college1}有{len(college1_data)}筆，{college2}有{len(college2_data)}筆")
@@ -617,29 +591,10 @@ class TTestAnalyzer:
             stem_colleges = {"理學院", "工學院", "電機資訊學院"}
             hum_colleges = {"商學院", "設計學院", "人文與教育學院", "法學院"}
 
-            stem_scores = []
-            hum_scores = []
-
-            for _, row in self.data.iterrows():
-                college = row.get('學院')
-                if pd.isna(college):
-                    continue
-
-                if course_type == "通識課程":
-                    scores = [row.get('通識必修'), row.get('通識選修')]
-                    valid = [s for s in scores if pd.notna(s)]
-                    if not valid:
-                        continue
-                    score = np.mean(valid)
-                else:  # 一般選修
-                    score = row.get('一般選修')
-                    if pd.isna(score):
-                        continue
-
-                if college in stem_colleges:
-                    stem_scores.append(score)
-                elif college in hum_colleges:
-                    hum_scores.append(score)
+            # 通識課程為兩個通識欄位的平均，否則為一般選修
+            scores = self._course_type_scores(course_type)
+            stem_scores = scores[self.data['學院'].isin(stem_colleges)].dropna().to_numpy()
+            hum_scores = scores[self.data['學院'].isin(hum_colleges)].dropna().to_numpy()
 
             if len(stem_scores) < 2 or len(hum_scores) < 2:
                 messagebox.showerror("錯誤", f"資料不足：理工組{len(stem_scores)}筆、人文社科組{len(hum_scores)}筆")
@@ -666,16 +621,10 @@ class TTestAnalyzer:
             messagebox.showerror("錯誤", "請先載入資料檔案")
             return
         try:
-            max_scores = []
-            min_scores = []
-
-            for _, row in self.data.iterrows():
-                values = [row.get('一般必修'), row.get('一般選修'), row.get('通識必修'), row.get('通識選修')]
-                valid = [v for v in values if pd.notna(v)]
-                if len(valid) < 2:
-                    continue
-                max_scores.append(np.max(valid))
-                min_scores.append(np.min(valid))
+            # 至少有兩個類別的成績才比較
+            stable = self.data[self.data[VALID_COUNT_COLUMN] >= 2]
+            max_scores = stable[MAX_SCORE_COLUMN].to_numpy()
+            min_scores = stable[MIN_SCORE_COLUMN].to_numpy()
 
             if len(max_scores) < 2:
                 messagebox.showerror("錯誤", "有效配對資料不足")
@@ -700,17 +649,7 @@ class TTestAnalyzer:
             messagebox.showerror("錯誤", "請先載入資料檔案")
             return
         try:
-            major_scores = []
-            nonmajor_scores = []
-
-            for _, row in self.data.iterrows():
-                major = [row.get('一般必修'), row.get('一般選修')]
-                liberal = [row.get('通識必修'), row.get('通識選修')]
-                major_valid = [s for s in major if pd.notna(s)]
-                liberal_valid = [s for s in liberal if pd.notna(s)]
-                if major_valid and liberal_valid:
-                    major_scores.append(float(np.mean(major_valid)))
-                    nonmajor_scores.append(float(np.mean(liberal_valid)))
+            major_scores, nonmajor_scores = self._major_liberal_pairs()
 
             if len(major_scores) < 2:
                 messagebox.showerror("錯誤", "有效配對資料不足")
@@ -745,36 +684,16 @@ class TTestAnalyzer:
                 if len(dept_data) < 10:
                     continue
 
-                # 科系內計算GPA與『必修平均-選修平均』
-                gpa_list = []  # (index, gpa)
-                diff_map = {}  # index -> diff
-                for idx, row in dept_data.iterrows():
-                    scores = [row.get('一般必修'), row.get('一般選修'), row.get('通識必修'), row.get('通識選修')]
-                    valid_scores = [s for s in scores if pd.notna(s)]
-                    if len(valid_scores) < 2:
-                        continue
-                    gpa = float(np.mean(valid_scores))
-                    # 必修平均與選修平均
-                    req_valid = [s for s in [row.get('一般必修'), row.get('通識必修')] if pd.notna(s)]
-                    ele_valid = [s for s in [row.get('一般選修'), row.get('通識選修')] if pd.notna(s)]
-                    if not req_valid or not ele_valid:
-                        continue
-                    diff = float(np.mean(req_valid) - np.mean(ele_valid))
-                    gpa_list.append((idx, gpa))
-                    diff_map[idx] = diff
-
-                if len(gpa_list) < 10:
+                # 科系內依GPA排序，只取同時有必修與選修成績的學生
+                ranking = self._gpa_ranking(dept_data, GAP_COLUMN)
+                if len(ranking) < 10:
                     continue
 
-                gpa_list.sort(key=lambda x: x[1])
-                n = len(gpa_list)
+                n = len(ranking)
                 bottom_20 = int(n * 0.2)
                 top_20 = int(n * 0.8)
-                bottom_ids = [i for i, _ in gpa_list[:bottom_20]]
-                top_ids = [i for i, _ in gpa_list[top_20:]]
-
-                top_diffs.extend([diff_map[i] for i in top_ids if i in diff_map])
-                bottom_diffs.extend([diff_map[i] for i in bottom_ids if i in diff_map])
+                top_diffs.extend(dept_data.loc[ranking[top_20:], GAP_COLUMN].tolist())
+                bottom_diffs.extend(dept_data.loc[ranking[:bottom_20], GAP_COLUMN].tolist())
 
             if len(top_diffs) < 2 or len(bottom_diffs) < 2:
                 messagebox.showerror("錯誤", f"資料不足：頂尖組{len(top_diffs)}筆、後段組{len(bottom_diffs)}筆")
@@ -801,36 +720,28 @@ class TTestAnalyzer:
             return
         
         try:
-            # 計算每個學生的GPA（所有成績的平均）
-            gpa_data = []
-            for idx, row in self.data.iterrows():
-                scores = [row['一般必修'], row['一般選修'], row['通識必修'], row['通識選修']]
-                valid_scores = [s for s in scores if pd.notna(s)]
-                if len(valid_scores) >= 2:  # 至少要有2門課的成績
-                    gpa_data.append((idx, np.mean(valid_scores)))
-            
-            if len(gpa_data) < 10:
+            # 依每個學生的GPA（所有成績的平均）排序，至少要有2個類別的成績
+            ranking = self._gpa_ranking(self.data)
+            
+            if len(ranking) < 10:
                 messagebox.showerror("錯誤", "有效GPA資料不足")
                 return
             
-            # 排序並取前30%和後30%
-            gpa_data.sort(key=lambda x: x[1])
-            n = len(gpa_data)
+            # 取前30%和後30%
+            n = len(ranking)
             bottom_30_percent = int(n * 0.3)
             top_30_percent = int(n * 0.7)
             
-            low_gpa_indices = [x[0] for x in gpa_data[:bottom_30_percent]]
-            high_gpa_indices = [x[0] for x in gpa_data[top_30_percent:]]
+            low_gpa_indices = ranking[:bottom_30_percent]
+            high_gpa_indices = ranking[top_30_percent:]
             
             # 比較各科目類型
             subjects = ['一般必修', '一般選修', '通識必修', '通識選修']
             results = {}
             
             for subject in subjects:
-                high_scores = [self.data.loc[i, subject] for i in high_gpa_indices 
-                              if pd.notna(self.data.loc[i, subject])]
-                low_scores = [self.data.loc[i, subject] for i in low_gpa_indices 
-                             if pd.notna(self.data.loc[i, subject])]
+                high_scores = self.data.loc[high_gpa_indices, subject].dropna().to_numpy()
+                low_scores = self.data.loc[low_gpa_indices, subject].dropna().to_numpy()
                 
                 if len(high_scores) >= 2 and len(low_scores) >= 2:
                     statistic, p_value = stats.ttest_ind(high_scores, low_scores)
@@ -887,35 +798,27 @@ class TTestAnalyzer:
                 if len(dept_data) < 10:  # 科系人數太少跳過
                     continue
                 
-                # 計算科系內GPA
-                gpa_scores = []
-                for idx, row in dept_data.iterrows():
-                    scores = [row['一般必修'], row['一般選修'], row['通識必修'], row['通識選修']]
-                    valid_scores = [s for s in scores if pd.notna(s)]
-                    if len(valid_scores) >= 2:
-                        gpa_scores.append((idx, np.mean(valid_scores)))
+                # 依科系內GPA排序
+                ranking = self._gpa_ranking(dept_data)
                 
-                if len(gpa_scores) < 10:
+                if len(ranking) < 10:
                     continue
                 
-                # 排序並取前20%和後20%
-                gpa_scores.sort(key=lambda x: x[1])
-                n = len(gpa_scores)
+                # 取前20%和後20%
+                n = len(ranking)
                 bottom_20_percent = int(n * 0.2)
                 top_20_percent = int(n * 0.8)
                 
-                bottom_indices = [x[0] for x in gpa_scores[:bottom_20_percent]]
-                top_indices = [x[0] for x in gpa_scores[top_20_percent:]]
+                bottom_indices = ranking[:bottom_20_percent]
+                top_indices = ranking[top_20_percent:]
                 
                 # 比較各科目
                 dept_results = {}
                 subjects = ['一般必修', '一般選修', '通識必修', '通識選修']
                 
                 for subject in subjects:
-                    top_scores = [self.data.loc[i, subject] for i in top_indices 
-                                 if pd.notna(self.data.loc[i, subject])]
-                    bottom_scores = [self.data.loc[i, subject] for i in bottom_indices 
-                                   if pd.notna(self.data.loc[i, subject])]
+                    top_scores = self.data.loc[top_indices, subject].dropna().to_numpy()
+                    bottom_scores = self.data.loc[bottom_indices, subject].dropna().to_numpy()
                     
                     if len(top_scores) >= 2 and len(bottom_scores) >= 2:
                         statistic, p_value = stats.ttest_ind(top_scores, bottom_scores)
@@ -957,43 +860,26 @@ class TTestAnalyzer:
             return
         
         try:
-            # 計算必修課平均成績
-            required_avg = []
-            for idx, row in self.data.iterrows():
-                req_scores = [row['一般必修'], row['通識必修']]
-                valid_req = [s for s in req_scores if pd.notna(s)]
-                if valid_req:
-                    required_avg.append((idx, np.mean(valid_req)))
+            # 必修課平均成績（衍生指標欄位）
+            required_avg = self.data[REQUIRED_MEAN_COLUMN].dropna()
             
             if len(required_avg) < 10:
                 messagebox.showerror("錯誤", "有效必修成績資料不足")
                 return
             
-            # 取必修課成績前30%的學生
-            required_avg.sort(key=lambda x: x[1], reverse=True)
+            # 取必修課成績前30%的學生（同分維持原順序）
             top_30_percent = int(len(required_avg) * 0.3)
-            high_required_students = [x[0] for x in required_avg[:top_30_percent]]
+            high_required_students = required_avg.sort_values(ascending=False, kind='stable').index[:top_30_percent]
             
             # 分析這些學生的選修課表現
-            elective_scores = []
-            for idx in high_required_students:
-                row = self.data.loc[idx]
-                elec_scores = [row['一般選修'], row['通識選修']]
-                valid_elec = [s for s in elec_scores if pd.notna(s)]
-                if valid_elec:
-                    elective_scores.append(np.mean(valid_elec))
+            elective_scores = self.data.loc[high_required_students, ELECTIVE_MEAN_COLUMN].dropna().to_numpy()
             
             if len(elective_scores) < 2:
                 messagebox.showerror("錯誤", "高必修分學生的選修資料不足")
                 return
             
             # 比較必修高分學生的選修成績與全體學生的選修成績
-            all_elective_scores = []
-            for idx, row in self.data.iterrows():
-                elec_scores = [row['一般選修'], row['通識選修']]
-                valid_elec = [s for s in elec_scores if pd.notna(s)]
-                if valid_elec:
-                    all_elective_scores.append(np.mean(valid_elec))
+            all_elective_scores = self.data[ELECTIVE_MEAN_COLUMN].dropna().to_numpy()
             
             if len(all_elective_scores) < 10:
                 messagebox.showerror("錯誤", "全體選修成績資料不足")
@@ -1026,43 +912,26 @@ class TTestAnalyzer:
             return
         
         try:
-            # 計算選修課平均成績
-            elective_avg = []
-            for idx, row in self.data.iterrows():
-                elec_scores = [row['一般選修'], row['通識選修']]
-                valid_elec = [s for s in elec_scores if pd.notna(s)]
-                if valid_elec:
-                    elective_avg.append((idx, np.mean(valid_elec)))
+            # 選修課平均成績（衍生指標欄位）
+            elective_avg = self.data[ELECTIVE_MEAN_COLUMN].dropna()
             
             if len(elective_avg) < 10:
                 messagebox.showerror("錯誤", "有效選修成績資料不足")
                 return
             
-            # 取選修課成績前30%的學生
-            elective_avg.sort(key=lambda x: x[1], reverse=True)
+            # 取選修課成績前30%的學生（同分維持原順序）
             top_30_percent = int(len(elective_avg) * 0.3)
-            high_elective_students = [x[0] for x in elective_avg[:top_30_percent]]
+            high_elective_students = elective_avg.sort_values(ascending=False, kind='stable').index[:top_30_percent]
             
             # 分析這些學生的必修課表現
-            required_scores = []
-            for idx in high_elective_students:
-                row = self.data.loc[idx]
-                req_scores = [row['一般必修'], row['通識必修']]
-                valid_req = [s for s in req_scores if pd.notna(s)]
-                if valid_req:
-                    required_scores.append(np.mean(valid_req))
+            required_scores = self.data.loc[high_elective_students, REQUIRED_MEAN_COLUMN].dropna().to_numpy()
             
             if len(required_scores) < 2:
                 messagebox.showerror("錯誤", "高選修分學生的必修資料不足")
                 return
             
             # 比較選修高分學生的必修成績與全體學生的必修成績
-            all_required_scores = []
-            for idx, row in self.data.iterrows():
-                req_scores = [row['一般必修'], row['通識必修']]
-                valid_req = [s for s in req_scores if pd.notna(s)]
-                if valid_req:
-                    all_required_scores.append(np.mean(valid_req))
+            all_required_scores = self.data[REQUIRED_MEAN_COLUMN].dropna().to_numpy()
             
             if len(all_required_scores) < 10:
                 messagebox.showerror("錯誤", "全體必修成績資料不足")
@@ -1088,6 +957,25 @@ class TTestAnalyzer:
         except Exception as e:
             messagebox.showerror("錯誤", f"分析時發生錯誤: {str(e)}")
     
+    def _course_type_scores(self, course_type):
+        """每位學生在某課程類型的成績：'通識課程'為兩個通識欄位有成績者的平均，其他為該欄位本身"""
+        if course_type == "通識課程":
+            return row_mean(self.data, LIBERAL_COLUMNS)
+        return self.data[course_type]
+    
+    def _major_liberal_pairs(self):
+        """專業課程(一般必修+一般選修)與通識課程(通識必修+通識選修)的平均，只保留兩者皆有成績的學生"""
+        pairs = pd.DataFrame({'major': row_mean(self.data, MAJOR_COLUMNS),
+                              'liberal': row_mean(self.data, LIBERAL_COLUMNS)}).dropna()
+        return pairs['major'].to_numpy(), pairs['liberal'].to_numpy()
+    
+    def _gpa_ranking(self, data, *required_columns):
+        """有2個以上類別成績（且 required_columns 皆有值）的學生，依總體GPA由低到高排序的索引，同分維持原順序"""
+        eligible = data[VALID_COUNT_COLUMN] >= 2
+        if required_columns:
+            eligible &= data[list(required_columns)].notna().all(axis=1)
+        return data.loc[eligible, GPA_COLUMN].sort_values(kind='stable').index
+    
     def display_ttest_result(self, title, statistic, p_value, desc_stats):
         """顯示t-test結果"""
         # 清空之前的結果
@@ -1155,17 +1043,14 @@ class TTestAnalyzer:
         interdisciplinary_analysis = 1  # 理工vs人文社科
         # 第六類：學習能力分層分析（4個）
         performance_tier_analysis = 4  # 6a.各系頂尖vs後段各科目 + 6b.必修選修差 + 6c.高低GPA + 6d.必修高分學生選修表現
-        # 第七類：學院間比較分析
-        colleges_count = 7
-        college_combinations = (colleges_count * (colleges_count - 1)) // 2  # 21組合
-        course_types_count = 4
-        college_comparison_tests = college_combinations * course_types_count  # 84個測試
+        # 第七類：學院間比較分析（所有學院配對 × 4種課程類型，由各學院的統計量一次算出）
+        college_comparison_tests = 1
         
         total_steps = (basic_paired_tests + institutional_analysis + discipline_analysis + 
                       stability_analysis + interdisciplinary_analysis + performance_tier_analysis + 
                       college_comparison_tests)
         
-        logger.info(f"預計執行 {total_steps} 項分析")
+        logger.info("預計執行 %s 項分析", total_steps)
         
         try:
             # ========== 第一類：基礎課程類型比較（配對t-test）==========
@@ -1188,7 +1073,7 @@ class TTestAnalyzer:
                     progress_callback(current_step, f"配對t-test: {col1} vs {col2}")
                 
                 try:
-                    logger.debug(f"分析 {col1} vs {col2}")
+                    logger.debug("分析 %s vs %s", col1, col2)
                     valid_data = self.data[[col1, col2]].dropna()
                     
                     if len(valid_data) >= 2:
@@ -1208,12 +1093,12 @@ class TTestAnalyzer:
                             'n_pairs': len(valid_data),
                             'significance': self._get_significance(p_value)
                         }
-                        logger.debug(f"完成 {col1} vs {col2}, p={p_value:.4f}")
+                        logger.debug("完成 %s vs %s, p=%.4f", col1, col2, p_value)
                     else:
-                        logger.warning(f"{col1} vs {col2}: 有效資料不足 ({len(valid_data)}筆)")
+                        logger.warning("%s vs %s: 有效資料不足 (%s筆)", col1, col2, len(valid_data))
                         
                 except Exception as e:
-                    logger.error(f"分析 {col1} vs {col2} 時發生錯誤: {str(e)}")
+                    logger.error("分析 %s vs %s 時發生錯誤: %s", col1, col2, e)
                     continue
             
             # ========== 第二類：制度性分析（配對t-test）==========
@@ -1224,19 +1109,9 @@ class TTestAnalyzer:
             
             try:
                 logger.debug("分析所有必修vs所有選修")
-                required_scores = []
-                elective_scores = []
-                
-                for idx, row in self.data.iterrows():
-                    req_scores = [row['一般必修'], row['通識必修']]
-                    elec_scores = [row['一般選修'], row['通識選修']]
-                    
-                    req_valid = [s for s in req_scores if pd.notna(s)]
-                    elec_valid = [s for s in elec_scores if pd.notna(s)]
-                    
-                    if req_valid and elec_valid:
-                        required_scores.append(np.mean(req_valid))
-                        elective_scores.append(np.mean(elec_valid))
+                paired = self.data[[REQUIRED_MEAN_COLUMN, ELECTIVE_MEAN_COLUMN]].dropna()
+                required_scores = paired[REQUIRED_MEAN_COLUMN].to_numpy()
+                elective_scores = paired[ELECTIVE_MEAN_COLUMN].to_numpy()
                 
                 if len(required_scores) >= 2:
                     statistic, p_value = stats.ttest_rel(required_scores, elective_scores)
@@ -1254,11 +1129,11 @@ class TTestAnalyzer:
                         'n_pairs': len(required_scores),
                         'significance': self._get_significance(p_value)
                     }
-                    logger.debug(f"完成所有必修vs所有選修, p={p_value:.4f}")
+                    logger.debug("完成所有必修vs所有選修, p=%.4f", p_value)
                 else:
-                    logger.warning(f"所有必修vs所有選修: 有效資料不足 ({len(required_scores)}筆)")
+                    logger.warning("所有必修vs所有選修: 有效資料不足 (%s筆)", len(required_scores))
             except Exception as e:
-                logger.error(f"分析所有必修vs所有選修時發生錯誤: {str(e)}")
+                logger.error("分析所有必修vs所有選修時發生錯誤: %s", e)
             
             # ========== 第三類：學科性質分析（配對t-test）==========
             # 目的：比較專業教育與通識教育的整體學習成效
@@ -1266,17 +1141,7 @@ class TTestAnalyzer:
             if progress_callback:
                 progress_callback(current_step, "配對t-test: 專業課程整體 vs 通識課程整體")
             try:
-                major_scores, liberal_scores = [], []
-                for _, row in self.data.iterrows():
-                    # 專業課程：一般必修+一般選修的平均
-                    major = [row.get('一般必修'), row.get('一般選修')]
-                    # 通識課程：通識必修+通識選修的平均
-                    liberal = [row.get('通識必修'), row.get('通識選修')]
-                    major_valid = [s for s in major if pd.notna(s)]
-                    liberal_valid = [s for s in liberal if pd.notna(s)]
-                    if major_valid and liberal_valid:
-                        major_scores.append(float(np.mean(major_valid)))
-                        liberal_scores.append(float(np.mean(liberal_valid)))
+                major_scores, liberal_scores = self._major_liberal_pairs()
                 if len(major_scores) >= 2:
                     statistic, p_value = stats.ttest_rel(major_scores, liberal_scores)
                     all_results["配對t-test_專業課程整體_vs_通識課程整體"] = {
@@ -1293,7 +1158,7 @@ class TTestAnalyzer:
                         'significance': self._get_significance(p_value)
                     }
             except Exception as e:
-                logger.error(f"分析專業課程 vs 通識課程時發生錯誤: {str(e)}")
+                logger.error("分析專業課程 vs 通識課程時發生錯誤: %s", e)
 
             # ========== 第四類：個人學習穩定度分析（配對t-test）==========
             # 目的：分析個人在不同課程類型間的學習表現穩定性
@@ -1301,14 +1166,9 @@ class TTestAnalyzer:
             if progress_callback:
                 progress_callback(current_step, "配對t-test: 個人最高分類別 vs 最低分類別")
             try:
-                max_scores, min_scores = [], []
-                for _, row in self.data.iterrows():
-                    values = [row.get('一般必修'), row.get('一般選修'), row.get('通識必修'), row.get('通識選修')]
-                    valid = [v for v in values if pd.notna(v)]
-                    if len(valid) < 2:
-                        continue
-                    max_scores.append(float(np.max(valid)))
-                    min_scores.append(float(np.min(valid)))
+                stable = self.data[self.data[VALID_COUNT_COLUMN] >= 2]
+                max_scores = stable[MAX_SCORE_COLUMN].to_numpy()
+                min_scores = stable[MIN_SCORE_COLUMN].to_numpy()
                 if len(max_scores) >= 2:
                     statistic, p_value = stats.ttest_rel(max_scores, min_scores)
                     all_results["配對t-test_最高分類別_vs_最低分類別"] = {
@@ -1325,7 +1185,7 @@ class TTestAnalyzer:
                         'significance': self._get_significance(p_value)
                     }
             except Exception as e:
-                logger.error(f"分析學習表現穩定度時發生錯誤: {str(e)}")
+                logger.error("分析學習表現穩定度時發生錯誤: %s", e)
 
             # ========== 第五類：跨學科領域比較（獨立樣本t-test）==========
             # 目的：比較理工學科與人文社科學生的整體學習表現
@@ -1335,21 +1195,10 @@ class TTestAnalyzer:
             try:
                 stem_colleges = {"理學院", "工學院", "電機資訊學院"}
                 hum_colleges = {"商學院", "設計學院", "人文與教育學院", "法學院"}
-                stem_scores, hum_scores = [], []
-                for _, row in self.data.iterrows():
-                    college = row.get('學院')
-                    if pd.isna(college):
-                        continue
-                    # 整合所有課程類型的平均分數
-                    all_scores = [row.get('一般必修'), row.get('一般選修'), row.get('通識必修'), row.get('通識選修')]
-                    valid_scores = [s for s in all_scores if pd.notna(s)]
-                    if len(valid_scores) < 2:
-                        continue
-                    overall_score = float(np.mean(valid_scores))
-                    if college in stem_colleges:
-                        stem_scores.append(overall_score)
-                    elif college in hum_colleges:
-                        hum_scores.append(overall_score)
+                # 整合所有課程類型的平均分數（總體GPA），至少要有2個類別的成績
+                rated = self.data[self.data[VALID_COUNT_COLUMN] >= 2]
+                stem_scores = rated.loc[rated['學院'].isin(stem_colleges), GPA_COLUMN].to_numpy()
+                hum_scores = rated.loc[rated['學院'].isin(hum_colleges), GPA_COLUMN].to_numpy()
                 if len(stem_scores) >= 2 and len(hum_scores) >= 2:
                     statistic, p_value = stats.ttest_ind(stem_scores, hum_scores)
                     all_results["獨立樣本t-test_理工組_vs_人文社科組_整合表現"] = {
@@ -1367,7 +1216,7 @@ class TTestAnalyzer:
                         'significance': self._get_significance(p_value)
                     }
             except Exception as e:
-                logger.error(f"分析跨學科領域表現時發生錯誤: {str(e)}")
+                logger.error("分析跨學科領域表現時發生錯誤: %s", e)
 
             # ========== 第六類：學習能力分層分析（獨立樣本t-test）==========
             # 目的：比較頂尖學生與後段學生的學習表現差異
@@ -1385,31 +1234,23 @@ class TTestAnalyzer:
                     if len(dept_data) < 10:
                         continue
                     
-                    # 計算科系內GPA並排序
-                    gpa_scores = []
-                    for idx, row in dept_data.iterrows():
-                        scores = [row['一般必修'], row['一般選修'], row['通識必修'], row['通識選修']]
-                        valid_scores = [s for s in scores if pd.notna(s)]
-                        if len(valid_scores) >= 2:
-                            gpa_scores.append((idx, np.mean(valid_scores)))
+                    # 依科系內GPA排序
+                    ranking = self._gpa_ranking(dept_data)
                     
-                    if len(gpa_scores) < 10:
+                    if len(ranking) < 10:
                         continue
                     
-                    gpa_scores.sort(key=lambda x: x[1])
-                    n = len(gpa_scores)
+                    n = len(ranking)
                     bottom_20_percent = int(n * 0.2)
                     top_20_percent = int(n * 0.8)
                     
-                    bottom_indices = [x[0] for x in gpa_scores[:bottom_20_percent]]
-                    top_indices = [x[0] for x in gpa_scores[top_20_percent:]]
+                    bottom_indices = ranking[:bottom_20_percent]
+                    top_indices = ranking[top_20_percent:]
                     
                     # 對每個科目進行 t-test
                     for subject in subjects:
-                        top_scores = [self.data.loc[i, subject] for i in top_indices 
-                                     if pd.notna(self.data.loc[i, subject])]
-                        bottom_scores = [self.data.loc[i, subject] for i in bottom_indices 
-                                       if pd.notna(self.data.loc[i, subject])]
+                        top_scores = self.data.loc[top_indices, subject].dropna().to_numpy()
+                        bottom_scores = self.data.loc[bottom_indices, subject].dropna().to_numpy()
                         
                         if len(top_scores) >= 2 and len(bottom_scores) >= 2:
                             statistic, p_value = stats.ttest_ind(top_scores, bottom_scores)
@@ -1429,7 +1270,7 @@ class TTestAnalyzer:
                                 'significance': self._get_significance(p_value)
                             }
             except Exception as e:
-                logger.error(f"分析各系頂尖vs後段學生時發生錯誤: {str(e)}")
+                logger.error("分析各系頂尖vs後段學生時發生錯誤: %s", e)
             
             # 6b. 各系頂尖20% vs 後段20%的『必修-選修』差異
             current_step += 1
@@ -1441,31 +1282,14 @@ class TTestAnalyzer:
                     dept_data = self.data[self.data['科系'] == dept].copy()
                     if len(dept_data) < 10:
                         continue
-                    gpa_list = []
-                    diff_map = {}
-                    for idx, row in dept_data.iterrows():
-                        scores = [row.get('一般必修'), row.get('一般選修'), row.get('通識必修'), row.get('通識選修')]
-                        valid_scores = [s for s in scores if pd.notna(s)]
-                        if len(valid_scores) < 2:
-                            continue
-                        gpa = float(np.mean(valid_scores))
-                        req_valid = [s for s in [row.get('一般必修'), row.get('通識必修')] if pd.notna(s)]
-                        ele_valid = [s for s in [row.get('一般選修'), row.get('通識選修')] if pd.notna(s)]
-                        if not req_valid or not ele_valid:
-                            continue
-                        diff = float(np.mean(req_valid) - np.mean(ele_valid))
-                        gpa_list.append((idx, gpa))
-                        diff_map[idx] = diff
-                    if len(gpa_list) < 10:
+                    ranking = self._gpa_ranking(dept_data, GAP_COLUMN)
+                    if len(ranking) < 10:
                         continue
-                    gpa_list.sort(key=lambda x: x[1])
-                    n = len(gpa_list)
+                    n = len(ranking)
                     bottom_20 = int(n * 0.2)
                     top_20 = int(n * 0.8)
-                    bottom_ids = [i for i, _ in gpa_list[:bottom_20]]
-                    top_ids = [i for i, _ in gpa_list[top_20:]]
-                    top_diffs.extend([diff_map[i] for i in top_ids if i in diff_map])
-                    bottom_diffs.extend([diff_map[i] for i in bottom_ids if i in diff_map])
+                    top_diffs.extend(dept_data.loc[ranking[top_20:], GAP_COLUMN].tolist())
+                    bottom_diffs.extend(dept_data.loc[ranking[:bottom_20], GAP_COLUMN].tolist())
                 if len(top_diffs) >= 2 and len(bottom_diffs) >= 2:
                     statistic, p_value = stats.ttest_ind(top_diffs, bottom_diffs)
                     all_results["獨立樣本t-test_頂尖20%_vs_後段20%_必修減選修之差"] = {
@@ -1483,35 +1307,27 @@ class TTestAnalyzer:
                         'significance': self._get_significance(p_value)
                     }
             except Exception as e:
-                logger.error(f"分析頂尖與後段學生的『必修-選修』差時發生錯誤: {str(e)}")
+                logger.error("分析頂尖與後段學生的『必修-選修』差時發生錯誤: %s", e)
             
             # 6c. 高GPA vs 低GPA學生比較
             current_step += 1
             if progress_callback:
                 progress_callback(current_step, "高GPA vs 低GPA學生比較")
             try:
-                gpa_list = []
-                for idx, row in self.data.iterrows():
-                    scores = [row['一般必修'], row['一般選修'], row['通識必修'], row['通識選修']]
-                    valid_scores = [s for s in scores if pd.notna(s)]
-                    if len(valid_scores) >= 2:
-                        gpa_list.append((idx, np.mean(valid_scores)))
+                ranking = self._gpa_ranking(self.data)
                 
-                if len(gpa_list) >= 20:
-                    gpa_list.sort(key=lambda x: x[1])
-                    n = len(gpa_list)
+                if len(ranking) >= 20:
+                    n = len(ranking)
                     low_30_percent = int(n * 0.3)
                     high_30_percent = int(n * 0.7)
                     
-                    low_gpa_indices = [x[0] for x in gpa_list[:low_30_percent]]
-                    high_gpa_indices = [x[0] for x in gpa_list[high_30_percent:]]
+                    low_gpa_indices = ranking[:low_30_percent]
+                    high_gpa_indices = ranking[high_30_percent:]
                     
                     subjects = ['一般必修', '一般選修', '通識必修', '通識選修']
                     for subject in subjects:
-                        high_scores = [self.data.loc[i, subject] for i in high_gpa_indices 
-                                      if pd.notna(self.data.loc[i, subject])]
-                        low_scores = [self.data.loc[i, subject] for i in low_gpa_indices 
-                                     if pd.notna(self.data.loc[i, subject])]
+                        high_scores = self.data.loc[high_gpa_indices, subject].dropna().to_numpy()
+                        low_scores = self.data.loc[low_gpa_indices, subject].dropna().to_numpy()
                         
                         if len(high_scores) >= 2 and len(low_scores) >= 2:
                             statistic, p_value = stats.ttest_ind(high_scores, low_scores)
@@ -1531,39 +1347,21 @@ class TTestAnalyzer:
                                 'significance': self._get_significance(p_value)
                             }
             except Exception as e:
-                logger.error(f"分析高GPA vs 低GPA時發生錯誤: {str(e)}")
+                logger.error("分析高GPA vs 低GPA時發生錯誤: %s", e)
             
             # 6d. 必修高分學生的選修表現
             current_step += 1
             if progress_callback:
                 progress_callback(current_step, "必修高分學生的選修課表現分析")
             try:
-                required_avg = []
-                for idx, row in self.data.iterrows():
-                    req_scores = [row['一般必修'], row['通識必修']]
-                    valid_req = [s for s in req_scores if pd.notna(s)]
-                    if valid_req:
-                        required_avg.append((idx, np.mean(valid_req)))
+                required_avg = self.data[REQUIRED_MEAN_COLUMN].dropna()
                 
                 if len(required_avg) >= 10:
-                    required_avg.sort(key=lambda x: x[1], reverse=True)
                     top_30_percent = int(len(required_avg) * 0.3)
-                    high_required_students = [x[0] for x in required_avg[:top_30_percent]]
-                    
-                    elective_scores = []
-                    for idx in high_required_students:
-                        row = self.data.loc[idx]
-                        elec_scores = [row['一般選修'], row['通識選修']]
-                        valid_elec = [s for s in elec_scores if pd.notna(s)]
-                        if valid_elec:
-                            elective_scores.append(np.mean(valid_elec))
+                    high_required_students = required_avg.sort_values(ascending=False, kind='stable').index[:top_30_percent]
                     
-                    overall_elective = []
-                    for idx, row in self.data.iterrows():
-                        elec_scores = [row['一般選修'], row['通識選修']]
-                        valid_elec = [s for s in elec_scores if pd.notna(s)]
-                        if valid_elec:
-                            overall_elective.append(np.mean(valid_elec))
+                    elective_scores = self.data.loc[high_required_students, ELECTIVE_MEAN_COLUMN].dropna().to_numpy()
+                    overall_elective = self.data[ELECTIVE_MEAN_COLUMN].dropna().to_numpy()
                     
                     if len(elective_scores) >= 2 and len(overall_elective) >= 2:
                         statistic, p_value = stats.ttest_ind(elective_scores, overall_elective)
@@ -1582,69 +1380,56 @@ class TTestAnalyzer:
                             'significance': self._get_significance(p_value)
                         }
             except Exception as e:
-                logger.error(f"分析必修高分學生選修表現時發生錯誤: {str(e)}")
+                logger.error("分析必修高分學生選修表現時發生錯誤: %s", e)
 
             # ========== 第七類：學院間比較分析（獨立樣本t-test）==========
             # 目的：比較不同學院學生在各課程類型的學習表現差異
-            colleges = ["理學院", "工學院", "商學院", "設計學院", "人文與教育學院", "法學院", "電機資訊學院"]
+            # 各 (學院, 課程類型) 的筆數、平均與變異數只計算一次，所有學院配對的 t-test 再由這些統計量一次得出
+            if self.operation_cancelled:
+                logger.info("操作被取消")
+                return all_results
+            
+            current_step += 1
+            if progress_callback:
+                progress_callback(current_step, "學院比較: 所有學院配對")
+            
+            # 常見的七個學院依固定順序在前，資料中的其他學院依名稱排在後面
+            known_colleges = ["理學院", "工學院", "商學院", "設計學院", "人文與教育學院", "法學院", "電機資訊學院"]
             course_types = ["一般必修", "一般選修", "通識必修", "通識選修"]
             
             logger.info("執行學院間比較分析")
-            
-            for i, college1 in enumerate(colleges):
-                for j, college2 in enumerate(colleges):
-                    if i < j:  # 避免重複比較
-                        for course_type in course_types:
-                            if self.operation_cancelled:
-                                logger.info("操作被取消")
-                                return all_results
-                            
-                            current_step += 1
-                            if progress_callback:
-                                progress_callback(current_step, f"學院比較: {college1} vs {college2} ({course_type})")
-                            
-                            try:
-                                logger.debug(f"分析 {college1} vs {college2} ({course_type})")
-                                college1_data = []
-                                college2_data = []
-                                
-                                for idx, row in self.data.iterrows():
-                                    college = row['學院']
-                                    score = row[course_type]
-                                    
-                                    if pd.isna(score):
-                                        continue
-                                    
-                                    if college == college1:
-                                        college1_data.append(score)
-                                    elif college == college2:
-                                        college2_data.append(score)
-                                
-                                if len(college1_data) >= 2 and len(college2_data) >= 2:
-                                    statistic, p_value = stats.ttest_ind(college1_data, college2_data)
-                                    
-                                    result_key = f"獨立樣本t-test_{college1}_vs_{college2}_{course_type}"
-                                    all_results[result_key] = {
-                                        'type': 'independent_ttest',
-                                        'comparison': f"{college1} vs {college2} ({course_type})",
-                                        'statistic': statistic,
-                                        'p_value': p_value,
-                                        'mean1': np.mean(college1_data),
-                                        'std1': np.std(college1_data),
-                                        'n1': len(college1_data),
-                                        'mean2': np.mean(college2_data),
-                                        'std2': np.std(college2_data),
-                                        'n2': len(college2_data),
-                                        'mean_diff': np.mean(college1_data) - np.mean(college2_data),
-                                        'significance': self._get_significance(p_value)
-                                    }
-                                    logger.debug(f"完成 {college1} vs {college2} ({course_type}), p={p_value:.4f}")
-                                else:
-                                    logger.warning(f"{college1} vs {college2} ({course_type}): 資料不足 "
-                                                 f"({len(college1_data)}, {len(college2_data)})")
-                            except Exception as e:
-                                logger.error(f"分析 {college1} vs {college2} ({course_type}) 時發生錯誤: {str(e)}")
-                                continue
+            try:
+                data_colleges = set(self.data['學院'].dropna().astype(str))
+                colleges = known_colleges + sorted(data_colleges - set(known_colleges))
+                college_stats = group_statistics(self.data, '學院', course_types)
+                comparisons = pairwise_ttests(college_stats, group_pairs(colleges), course_types)
+            except Exception as e:
+                logger.error("分析學院間比較時發生錯誤: %s", e)
+                return all_results
+            
+            for row in comparisons.itertuples(index=False):
+                college1, college2, course_type = row.group1, row.group2, row.column
+                if row.n1 < MIN_GROUP_SIZE or row.n2 < MIN_GROUP_SIZE:
+                    logger.warning("%s vs %s (%s): 資料不足 (%d, %d)", college1, college2,
+                                   course_type, row.n1, row.n2)
+                    continue
+                
+                result_key = f"獨立樣本t-test_{college1}_vs_{college2}_{course_type}"
+                all_results[result_key] = {
+                    'type': 'independent_ttest',
+                    'comparison': f"{college1} vs {college2} ({course_type})",
+                    'statistic': row.statistic,
+                    'p_value': row.p_value,
+                    'mean1': row.mean1,
+                    'std1': row.std1,
+                    'n1': row.n1,
+                    'mean2': row.mean2,
+                    'std2': row.std2,
+                    'n2': row.n2,
+                    'mean_diff': row.mean1 - row.mean2,
+                    'significance': self._get_significance(row.p_value)
+                }
+                logger.debug("完成 %s vs %s (%s), p=%.4f", college1, college2, course_type, row.p_value)
             
             return all_results
             
@@ -1676,7 +1461,7 @@ class TTestAnalyzer:
             import datetime
             
             # 計算預估分析數量並建立進度視窗
-            estimated_steps = 90  # 6個配對測試 + 84個學院比較
+            estimated_steps = 13  # 12項分析 + 學院比較（所有學院配對一次計算）
             self.create_progress_window("執行所有統計分析...", estimated_steps)
             
             # 執行所有分析
@@ -1695,7 +1480,7 @@ class TTestAnalyzer:
             
             # 選擇儲存位置
             self.close_progress_window()
-            logger.info(f"完成分析，共 {len(all_results)} 項結果")
+            logger.info("完成分析，共 %s 項結果", len(all_results))
             
             filename = filedialog.asksaveasfilename(
                 title="儲存完整分析報表",
@@ -1710,7 +1495,7 @@ class TTestAnalyzer:
             
             # 建立Excel儲存進度視窗
             self.create_progress_window("儲存Excel檔案...", 7)
-            logger.info(f"開始儲存Excel檔案: {filename}")
+            logger.info("開始儲存Excel檔案: %s", filename)
             
             # 建立Excel工作簿
             with pd.ExcelWriter(filename, engine='openpyxl') as writer:
@@ -1751,7 +1536,7 @@ class TTestAnalyzer:
                 if paired_data:
                     paired_df = pd.DataFrame(paired_data)
                     paired_df.to_excel(writer, sheet_name='配對t-test結果', index=False)
-                    logger.debug(f"完成配對t-test結果工作表，{len(paired_data)}項結果")
+                    logger.debug("完成配對t-test結果工作表，%s項結果", len(paired_data))
                 
                 # 3. 獨立樣本t-test結果
                 independent_data = []
@@ -1827,14 +1612,14 @@ class TTestAnalyzer:
                          f"其中 {significant_count} 項達到顯著水準 (p < 0.05)"
             
             messagebox.showinfo("成功", success_msg)
-            logger.info(f"Excel報表儲存完成: {filename}")
-            logger.info(f"統計摘要: 總分析{len(all_results)}項, 顯著{significant_count}項")
+            logger.info("Excel報表儲存完成: %s", filename)
+            logger.info("統計摘要: 總分析%s項, 顯著%s項", len(all_results), significant_count)
             
         except Exception as e:
             self.close_progress_window()
             error_msg = f"導出Excel時發生錯誤: {str(e)}"
             logger.error(error_msg)
-            logger.error(f"錯誤詳情: {traceback.format_exc()}")
+            logger.error("錯誤詳情: %s", traceback.format_exc())
             messagebox.showerror("錯誤", error_msg)
     
     def clear_results(self):
@@ -1847,11 +1632,11 @@ class TTestAnalyzer:
 def main():
     logger.info("=" * 50)
     logger.info("T-test分析工具啟動")
-    logger.info(f"Python版本: {sys.version}")
-    logger.info(f"Pandas版本: {pd.__version__}")
-    logger.info(f"NumPy版本: {np.__version__}")
-    logger.info(f"SciPy版本: {stats.__version__ if hasattr(stats, '__version__') else 'Unknown'}")
-    logger.info(f"工作目錄: {os.getcwd()}")
+    logger.info("Python版本: %s", sys.version)
+    logger.info("Pandas版本: %s", pd.__version__)
+    logger.info("NumPy版本: %s", np.__version__)
+    logger.info("SciPy版本: %s", stats.__version__ if hasattr(stats, '__version__') else 'Unknown')
+    logger.info("工作目錄: %s", os.getcwd())
     logger.info("=" * 50)
     
     try:
@@ -1861,8 +1646,8 @@ def main():
         root.mainloop()
         logger.info("程式正常結束")
     except Exception as e:
-        logger.error(f"程式執行時發生嚴重錯誤: {str(e)}")
-        logger.error(f"錯誤詳情: {traceback.format_exc()}")
+        logger.error("程式執行時發生嚴重錯誤: %s", e)
+        logger.error("錯誤詳情: %s", traceback.format_exc())
         raise
 
 if __name__ == "__main__":
@@ -11,6 +11,12 @@ import threading
 import os
 from datetime import datetime
 import warnings
+
+from course_schema import SUMMARY_SCORE_COLUMNS, apply_course_schema, format_memory, schema_memory_report, summary_scores
+from data_loader import read_table
+from progress_channel import ProgressChannel
+from student_metrics import student_metrics
+
 warnings.filterwarnings('ignore')
 
 # 設定中文字體
@@ -27,7 +33,11 @@ class CorrelationAnalysisGUI:
         # 檔案路徑
         self.file_path = tk.StringVar()
         
+        # 分析在背景執行緒執行，畫面更新經由此通道交給主迴圈
+        self.progress_channel = ProgressChannel(self.root)
+        
         self.create_widgets()
+        self.progress_channel.start()
         
     def create_widgets(self):
         # 主框架
@@ -123,16 +133,17 @@ class CorrelationAnalysisGUI:
             self.file_path.set(filename)
             
     def update_status(self, message):
-        self.status_label.config(text=message)
-        self.root.update()
+        self.progress_channel.update("status", self.status_label.config, text=message)
         
     def update_results(self, message):
+        self.progress_channel.call(self._append_result, message)
+        
+    def _append_result(self, message):
         self.results_text.insert(tk.END, message + "\n")
         self.results_text.see(tk.END)
-        self.root.update()
         
     def clear_results(self):
-        self.results_text.delete(1.0, tk.END)
+        self.progress_channel.call(self.results_text.delete, 1.0, tk.END)
         
     def start_analysis(self):
         file_path = self.file_path.get()
@@ -153,29 +164,29 @@ class CorrelationAnalysisGUI:
         
     def run_analysis(self):
         try:
-            self.analyze_button.config(state='disabled')
-            self.progress.start()
+            self.progress_channel.call(self.analyze_button.config, state='disabled')
+            self.progress_channel.call(self.progress.start)
             self.clear_results()
             
             # 執行分析
             self.perform_analysis()
             
         except Exception as e:
-            messagebox.showerror("分析錯誤", f"分析過程中發生錯誤:\n{str(e)}")
+            self.progress_channel.call(messagebox.showerror, "分析錯誤", f"分析過程中發生錯誤:\n{str(e)}")
         finally:
-            self.progress.stop()
-            self.analyze_button.config(state='normal')
+            self.progress_channel.call(self.progress.stop)
+            self.progress_channel.call(self.analyze_button.config, state='normal')
             
     def perform_analysis(self):
         file_path = self.file_path.get()
         
         # 檢查是否為檔案路徑還是目錄路徑
         if os.path.isdir(file_path):
-            messagebox.showerror("錯誤", "請選擇Excel檔案，而非目錄!")
+            self.progress_channel.call(messagebox.showerror, "錯誤", "請選擇Excel檔案，而非目錄!")
             return
             
         if not file_path.endswith(('.xlsx', '.xls')):
-            messagebox.showerror("錯誤", "請選擇Excel檔案!")
+            self.progress_channel.call(messagebox.showerror, "錯誤", "請選擇Excel檔案!")
             return
         
         # 1. 載入資料
@@ -185,20 +196,26 @@ class CorrelationAnalysisGUI:
         
         # 讀取Excel檔案
         try:
-            df = pd.read_excel(file_path, engine='openpyxl')
+            df = read_table(file_path, engine='openpyxl')
         except Exception as e:
-            messagebox.showerror("讀取錯誤", f"無法讀取Excel檔案:\n{str(e)}")
+            self.progress_channel.call(messagebox.showerror, "讀取錯誤", f"無法讀取Excel檔案:\n{str(e)}")
             return
             
         self.update_results(f"原始資料筆數: {len(df):,}")
+        df, memory_before, memory_after = schema_memory_report(df)
+        self.update_results(f"記憶體用量: {format_memory(memory_before)} → {format_memory(memory_after)}")
+        df = summary_scores(df)
         
         # 檢查必要欄位是否存在
-        score_columns = ['一般必修', '一般選修', '通識必修', '通識選修']
+        score_columns = list(SUMMARY_SCORE_COLUMNS)
         missing_columns = [col for col in score_columns if col not in df.columns]
         if missing_columns:
-            messagebox.showerror("資料格式錯誤", f"檔案中缺少以下欄位:\n{', '.join(missing_columns)}")
+            self.progress_channel.call(messagebox.showerror, "資料格式錯誤", f"檔案中缺少以下欄位:\n{', '.join(missing_columns)}")
             return
         
+        # 02 輸出的彙整表已包含總體GPA等衍生指標，舊版檔案在此補算一次
+        df = student_metrics(df)
+        
         # 清理資料
         df_clean = df.dropna(subset=score_columns)
         self.update_results(f"有效資料筆數: {len(df_clean):,}")
@@ -325,7 +342,7 @@ class CorrelationAnalysisGUI:
             self.update_results(f"散佈圖: scatter_plots_{timestamp}.png")
             
         self.update_status("分析完成!")
-        messagebox.showinfo("完成", f"分析完成!\n結果已儲存至:\n{output_dir}")
+        self.progress_channel.call(messagebox.showinfo, "完成", f"分析完成!\n結果已儲存至:\n{output_dir}")
         
     def create_heatmap_chart(self, correlation_matrix, save_path):
         plt.figure(figsize=(10, 8))
@@ -426,8 +443,7 @@ class CorrelationAnalysisGUI:
         """
         self.update_results("\n=== GPA分層學習連結分析 ===")
         
-        # 計算總體GPA
-        df['總體GPA'] = df[score_columns].mean(axis=1)
+        # 總體GPA 已在載入時取得（見 student_metrics）
         
         # 分層
         n = len(df)
@@ -678,7 +694,7 @@ class CorrelationAnalysisGUI:
                 else:
                     year = f"學年_{len(year_data)+1}"
                 
-                df = pd.read_excel(file_path)
+                df = summary_scores(apply_course_schema(read_table(file_path)))
                 if all(col in df.columns for col in score_columns) and '學號' in df.columns:
                     # 只保留有完整資料的學生
                     df_clean = df.dropna(subset=score_columns + ['學號'])
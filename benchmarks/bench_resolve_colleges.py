@@ -0,0 +1,118 @@
+"""
+基本資料重複學號處理的效能比較
+比較 split_core.resolve_duplicate_colleges（groupby 向量化）與原本逐一學號過濾的迴圈
+
+執行方式：
+    python benchmarks/bench_resolve_colleges.py --students 200000
+
+原本的迴圈為 O(學號數 × 資料筆數)，完整跑 20 萬學號需要數十分鐘，
+因此預設只以前 --loop-students 個學號計時，再依每個學號的平均耗時推估總時間。
+設定 --loop-students 0 可完整執行原本的迴圈。
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from split_core import resolve_duplicate_colleges
+
+COLLEGES = ["理學院", "工學院", "商學院", "設計學院", "人文與教育學院", "法學院", "電機資訊學院"]
+
+
+def resolve_duplicate_colleges_loop(basic_df_selected, student_ids=None):
+    """原本 process_file_thread 中逐一學號過濾的處理方式（作為對照組）"""
+    processed_student_data = []
+    if student_ids is None:
+        student_ids = basic_df_selected['學號'].unique()
+
+    for student_id in student_ids:
+        student_records = basic_df_selected[basic_df_selected['學號'] == student_id]
+
+        if len(student_records) > 1:
+            unique_colleges = student_records['學院'].unique()
+            if len(unique_colleges) > 1:
+                main_college = student_records.iloc[0]['學院']
+                subsidiary_colleges = []
+                for i in range(1, len(student_records)):
+                    college = student_records.iloc[i]['學院']
+                    if college != main_college and college not in subsidiary_colleges:
+                        subsidiary_colleges.append(college)
+                processed_student_data.append({
+                    '學號': student_id,
+                    '學院': main_college,
+                    '附屬學院': ','.join(subsidiary_colleges)
+                })
+            else:
+                processed_student_data.append({
+                    '學號': student_id,
+                    '學院': unique_colleges[0],
+                    '附屬學院': ''
+                })
+        else:
+            processed_student_data.append({
+                '學號': student_id,
+                '學院': student_records.iloc[0]['學院'],
+                '附屬學院': ''
+            })
+
+    return pd.DataFrame(processed_student_data)
+
+
+def make_roster(n_students, duplicate_ratio, seed=0):
+    """產生測試用的基本資料：部分學號有多筆記錄（轉系、雙主修等）"""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(10000000, 10000000 + n_students).astype(str)
+    n_dup = int(n_students * duplicate_ratio)
+    dup_ids = rng.choice(ids, size=n_dup, replace=True)
+    all_ids = np.concatenate([ids, dup_ids])
+    order = rng.permutation(len(all_ids))
+    return pd.DataFrame({
+        '學號': all_ids[order],
+        '學院': rng.choice(COLLEGES, size=len(all_ids)),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比較重複學號處理的效能")
+    parser.add_argument("--students", type=int, default=200000, help="學號數量")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.05, help="重複記錄比例")
+    parser.add_argument("--loop-students", type=int, default=2000,
+                        help="原本迴圈實際計時的學號數（0 表示全部）")
+    args = parser.parse_args()
+
+    roster = make_roster(args.students, args.duplicate_ratio)
+    all_ids = roster['學號'].unique()
+    print(f"基本資料筆數: {len(roster):,}，學號數: {len(all_ids):,}")
+
+    start = time.perf_counter()
+    vectorized = resolve_duplicate_colleges(roster)
+    vectorized_seconds = time.perf_counter() - start
+    print(f"groupby 向量化: {vectorized_seconds:.3f} 秒")
+
+    loop_ids = all_ids if args.loop_students <= 0 else all_ids[:args.loop_students]
+    start = time.perf_counter()
+    looped = resolve_duplicate_colleges_loop(roster, loop_ids)
+    loop_seconds = time.perf_counter() - start
+    loop_total = loop_seconds / len(loop_ids) * len(all_ids)
+    if len(loop_ids) == len(all_ids):
+        print(f"原本迴圈: {loop_seconds:.3f} 秒")
+    else:
+        print(f"原本迴圈: {loop_seconds:.3f} 秒（{len(loop_ids):,} 個學號），"
+              f"推估全部 {loop_total:.1f} 秒")
+    print(f"加速倍數: 約 {loop_total / vectorized_seconds:,.0f} 倍")
+
+    # 兩種方式的結果必須一致
+    expected = looped.reset_index(drop=True)
+    actual = vectorized.iloc[:len(loop_ids)].reset_index(drop=True)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+    print("結果一致")
+
+
+if __name__ == "__main__":
+    main()
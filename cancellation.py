@@ -0,0 +1,14 @@
+"""
+共用的取消處理機制
+GUI 按下取消時設定 threading.Event，背景工作在各階段之間呼叫 check_cancelled 檢查並中止
+"""
+
+
+class ProcessingCancelled(Exception):
+    """使用者取消處理時拋出"""
+
+
+def check_cancelled(cancel_event):
+    """若已要求取消則拋出 ProcessingCancelled；cancel_event 為 None 時不檢查"""
+    if cancel_event is not None and cancel_event.is_set():
+        raise ProcessingCancelled("使用者已取消處理")
@@ -0,0 +1,112 @@
+"""
+課程資料表與學生彙整表共用的欄位型態
+重複值很多的文字欄位（學院、課程名稱等）轉為 category，學號使用整數鍵，成績使用 float32，
+讓多學年度的資料也能載入分析用的電腦記憶體
+"""
+
+import numpy as np
+import pandas as pd
+
+# 轉為 category 的低基數文字欄位，只處理資料表中存在的欄位
+CATEGORY_COLUMNS = ('學院', '附屬學院', '必選修', '課程代碼', '課程名稱', '學生系級', '科系', '開課學年期')
+STUDENT_ID_COLUMN = '學號'
+SCORE_COLUMN = '成績'
+
+# 讀取檔案時直接以文字解析學號，合併用的鍵值與檔案內容完全一致（保留開頭的 0，不經過浮點數）
+STUDENT_ID_DTYPE = {STUDENT_ID_COLUMN: str}
+
+# 不重複值超過筆數的此比例時，category 反而較佔空間，維持原型態
+MAX_CATEGORY_RATIO = 0.5
+
+# 學生彙整表（02_Filter 的輸出）的成績欄位；沒有成績為 NaN
+SUMMARY_SCORE_COLUMNS = ('一般必修', '一般選修', '通識必修', '通識選修')
+
+# 彙整表的格式版本，記錄在 DataFrame.attrs 中並隨 Parquet 附屬檔保存；成績欄位的型態改變時遞增
+# 版本 2：成績欄位固定為 float64（版本 1 在可精確表示時使用 float32，型態會隨資料而不同）
+SUMMARY_SCHEMA_KEY = 'summary_schema_version'
+SUMMARY_SCHEMA_VERSION = 2
+
+
+def frame_memory(df):
+    """返回資料表佔用的記憶體位元組數（包含字串內容）"""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def format_memory(num_bytes):
+    """將位元組數轉為易讀的字串，例如 '12.3 MB'"""
+    return f"{num_bytes / 1024 ** 2:.1f} MB"
+
+
+def _to_category(series):
+    """低基數欄位轉為 category，已是 category 或不重複值過多時返回原欄位"""
+    if isinstance(series.dtype, pd.CategoricalDtype) or len(series) == 0:
+        return series
+    if series.nunique(dropna=True) > len(series) * MAX_CATEGORY_RATIO:
+        return series
+    return series.astype('category')
+
+
+def _compact_student_id(series):
+    """沒有空值且皆為整數值的浮點數學號轉為 int64；文字學號維持原樣以保留開頭的 0"""
+    if not pd.api.types.is_float_dtype(series.dtype):
+        return series
+    values = series.to_numpy(dtype=float, na_value=np.nan)
+    if len(values) == 0 or not np.isfinite(values).all() or (np.mod(values, 1) != 0).any():
+        return series
+    return series.astype(np.int64)
+
+
+def _compact_scores(series):
+    """成績轉為 float32；只有在每個值都能以 float32 精確表示時才轉換，避免改變輸出的數值"""
+    if not pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+        return series
+    if series.dtype == np.float32:
+        return series
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    compact = values.astype(np.float32)
+    if not np.array_equal(compact.astype(np.float64), values, equal_nan=True):
+        return series
+    return pd.Series(compact, index=series.index, name=series.name)
+
+
+def apply_course_schema(df):
+    """依共用型態轉換資料表中存在的欄位，返回轉換後的資料表（原資料表的欄位會被取代）"""
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = _to_category(df[col])
+    if STUDENT_ID_COLUMN in df.columns:
+        df[STUDENT_ID_COLUMN] = _compact_student_id(df[STUDENT_ID_COLUMN])
+    if SCORE_COLUMN in df.columns:
+        df[SCORE_COLUMN] = _compact_scores(df[SCORE_COLUMN])
+    return df
+
+
+def apply_summary_schema(df, score_columns=SUMMARY_SCORE_COLUMNS):
+    """彙整表的成績欄位轉為 float64 並標記格式版本
+
+    無法解析的儲存格（空字串、手動輸入的文字等）轉為 NaN；不論資料內容，成績欄位的型態都固定為 float64，
+    各學年度的彙整表型態一致。
+    """
+    for col in score_columns:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(np.float64)
+    df.attrs[SUMMARY_SCHEMA_KEY] = SUMMARY_SCHEMA_VERSION
+    return df
+
+
+def summary_scores(df, score_columns=SUMMARY_SCORE_COLUMNS):
+    """確保彙整表的成績欄位為數值型態，供分析工具直接取出連續的 NumPy 陣列
+
+    由目前版本的 Parquet 附屬檔讀入時已帶有格式版本標記，直接返回；
+    讀取 Excel 或舊版輸出時逐欄轉換一次（見 apply_summary_schema）。
+    """
+    if df.attrs.get(SUMMARY_SCHEMA_KEY) == SUMMARY_SCHEMA_VERSION:
+        return df
+    return apply_summary_schema(df, score_columns)
+
+
+def schema_memory_report(df):
+    """套用共用型態並返回 (資料表, 轉換前位元組數, 轉換後位元組數)"""
+    before = frame_memory(df)
+    df = apply_course_schema(df)
+    return df, before, frame_memory(df)
@@ -0,0 +1,342 @@
+"""
+共用的資料載入函式
+每個輸出的 Excel 檔案旁可附帶同名的 Parquet 附屬檔，後續工具優先讀取附屬檔以省去解析 Excel 的時間
+原始檔案的解析結果另存於快取目錄，檔案未變更時直接載入快取
+"""
+
+import csv
+import hashlib
+import os
+import pickle
+from collections import Counter, namedtuple
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+# Parquet 需要 pyarrow，未安裝時不寫入也不讀取附屬檔
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+SIDECAR_SUFFIX = ".parquet"
+
+# 解析快取設定，可用環境變數 AH_PARSE_CACHE_DIR 指定目錄，AH_PARSE_CACHE=0 停用快取
+PARSE_CACHE_ENABLED = os.environ.get("AH_PARSE_CACHE", "1") != "0"
+PARSE_CACHE_DIR = os.environ.get("AH_PARSE_CACHE_DIR") or os.path.join(
+    os.path.expanduser("~"), ".cache", "2025-AH_Program", "parse_cache")
+PARSE_CACHE_MAX_BYTES = 2 * 1024 ** 3  # 超過此大小時刪除最久未使用的快取
+PARSE_CACHE_SUFFIX = ".pkl"
+
+# CSV 格式判斷：依序嘗試的編碼、候選分隔符號與取樣的位元組數
+CSV_ENCODINGS = ('utf-8-sig', 'big5', 'gbk', 'cp950')
+CSV_DELIMITERS = (',', '\t', ';', '|')
+SNIFF_BYTES = 64 * 1024
+
+# sniff_csv 的判斷結果：編碼、分隔符號、標題列之前要略過的行數
+CsvFormat = namedtuple("CsvFormat", ["encoding", "delimiter", "header_row"])
+
+
+def parquet_available():
+    """是否可以讀寫 Parquet 附屬檔"""
+    return pa is not None
+
+
+def sidecar_path(excel_path):
+    """返回 Excel 檔案對應的 Parquet 附屬檔路徑"""
+    return os.path.splitext(excel_path)[0] + SIDECAR_SUFFIX
+
+
+def _excel_cell_values(series):
+    """返回寫入 Excel 再由 openpyxl 讀回時的儲存格值"""
+    values = series.astype(object).to_numpy(copy=True)
+    missing = series.isna().to_numpy()
+    if pd.api.types.is_float_dtype(series.dtype):
+        # openpyxl 讀取時會把整數值的浮點數轉為 int
+        numbers = series.to_numpy(dtype=float, na_value=np.nan)
+        integral = ~missing & (np.mod(numbers, 1) == 0) & (np.abs(numbers) < 2 ** 53)
+        values[integral] = [int(value) for value in numbers[integral]]
+    # 空白儲存格讀回為空字串，之後由解析器轉為 NaN
+    values[missing] = ""
+    return values
+
+
+def excel_equivalent(df):
+    """轉換為與 pd.read_excel 讀回完全相同的 DataFrame
+
+    read_excel 會依儲存格內容重新推斷欄位型態（例如文字格式的學號讀回為整數、空字串讀回為 NaN），
+    附屬檔採用相同的解析器，後續工具不論讀取哪一種檔案都得到相同結果。
+    """
+    columns = [_excel_cell_values(df.iloc[:, idx]) for idx in range(df.shape[1])]
+    rows = [list(df.columns)]
+    rows.extend(list(row) for row in zip(*columns))
+    return TextParser(rows, header=0).read()
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def write_sidecar(df, excel_path):
+    """將資料寫成 Excel 檔案旁的 Parquet 附屬檔
+
+    成功時返回附屬檔路徑；未安裝 pyarrow 或欄位型態無法轉換時返回 None，
+    後續工具會改讀 Excel。
+    """
+    if not parquet_available():
+        return None
+
+    path = sidecar_path(excel_path)
+    temp_path = path + ".tmp"
+    try:
+        table = excel_equivalent(df)
+        table.attrs.update(df.attrs)  # 保留格式版本等標記
+        table.to_parquet(temp_path, index=False)
+        os.replace(temp_path, path)
+    except (ValueError, TypeError, pa.ArrowException):
+        # 同一欄混有數字與文字等情況無法以單一型態儲存
+        _remove_quietly(temp_path)
+        _remove_quietly(path)
+        return None
+    return path
+
+
+class SidecarChunkWriter:
+    """逐塊寫入 Parquet 附屬檔，供低記憶體輸出時使用
+
+    各塊的欄位型態以第一塊為準，後續無法轉換時（例如後面的塊才出現空值的整數欄位）放棄附屬檔。
+    """
+
+    def __init__(self, excel_path):
+        self.path = sidecar_path(excel_path)
+        self._temp_path = self.path + ".tmp"
+        self._writer = None
+        self._schema = None
+        self.failed = not parquet_available()
+
+    def write(self, chunk):
+        if self.failed:
+            return
+        try:
+            table = pa.Table.from_pandas(excel_equivalent(chunk), schema=self._schema, preserve_index=False)
+            if self._writer is None:
+                self._schema = table.schema
+                self._writer = pq.ParquetWriter(self._temp_path, self._schema)
+            self._writer.write_table(table)
+        except (ValueError, TypeError, pa.ArrowException):
+            self.abort()
+
+    def abort(self):
+        """放棄附屬檔並刪除已寫入的部分"""
+        self.failed = True
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        _remove_quietly(self._temp_path)
+        _remove_quietly(self.path)
+
+    def close(self):
+        """完成寫入，成功時返回附屬檔路徑"""
+        if self.failed or self._writer is None:
+            self.abort()
+            return None
+        self._writer.close()
+        self._writer = None
+        os.replace(self._temp_path, self.path)
+        # Excel 在最後一塊之後才存檔，更新時間戳記以免附屬檔被判定為過期
+        os.utime(self.path)
+        return self.path
+
+
+def find_sidecar(excel_path):
+    """返回可用的附屬檔路徑；附屬檔比 Excel 舊（Excel 被修改過）時視為失效"""
+    if not parquet_available():
+        return None
+    path = sidecar_path(excel_path)
+    if not os.path.exists(path):
+        return None
+    if os.path.exists(excel_path) and os.path.getmtime(path) < os.path.getmtime(excel_path):
+        return None
+    return path
+
+
+def _decode_sample(sample, encodings):
+    """以第一個可以解碼取樣內容的編碼解碼，返回 (編碼, 文字)"""
+    for encoding in encodings:
+        try:
+            return encoding, sample.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("無法解碼CSV檔案，請檢查檔案編碼格式")
+
+
+def sniff_csv(file_path, encodings=CSV_ENCODINGS, sample_bytes=SNIFF_BYTES):
+    """只讀取檔案開頭，判斷 CSV 的編碼、分隔符號與標題列位置
+
+    分隔符號取各行欄位數最一致且最多者；欄位數少於此數，或非空白欄位數少於多數資料列的開頭幾行
+    （例如報表標題）視為需略過的行。
+    """
+    with open(file_path, 'rb') as fh:
+        sample = fh.read(sample_bytes)
+        at_end = not fh.read(1)
+    if not at_end:
+        # 只保留完整的行，避免多位元組字元或資料列被截斷
+        sample = sample[:sample.rfind(b'\n') + 1] or sample
+
+    encoding, text = _decode_sample(sample, encodings)
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return CsvFormat(encoding, ',', 0)
+
+    best_delimiter, best_width = ',', 0
+    for delimiter in CSV_DELIMITERS:
+        widths = [len(row) for row in csv.reader(lines, delimiter=delimiter)]
+        # 以出現最多次的欄位數代表這個分隔符號切出的欄位數
+        width, _ = Counter(widths).most_common(1)[0]
+        if width > best_width:
+            best_delimiter, best_width = delimiter, width
+
+    header_row = 0
+    if best_width > 1:
+        rows = list(csv.reader(lines, delimiter=best_delimiter))
+        # 以分隔符號補齊欄位數的報表標題（例如'全校學籍資料,,'）欄位數與標題列相同，另以非空白欄位數判斷
+        filled = [sum(1 for field in row if field.strip()) for row in rows if len(row) >= best_width]
+        filled_width, _ = Counter(filled).most_common(1)[0]
+        for row in rows:
+            if len(row) >= best_width and sum(1 for field in row if field.strip()) >= filled_width:
+                break
+            header_row += 1
+    return CsvFormat(encoding, best_delimiter, header_row)
+
+
+def read_csv_sniffed(file_path, encodings=CSV_ENCODINGS, **read_csv_kwargs):
+    """先以 sniff_csv 判斷格式，再以 C 引擎一次解析整個檔案
+
+    取樣之後才出現無法解碼的內容時，改用清單中之後的編碼重新解析。
+    """
+    csv_format = sniff_csv(file_path, encodings)
+    remaining = list(encodings[list(encodings).index(csv_format.encoding):])
+    while True:
+        try:
+            return pd.read_csv(file_path, encoding=remaining[0], sep=csv_format.delimiter,
+                               skiprows=csv_format.header_row, engine='c', **read_csv_kwargs)
+        except UnicodeDecodeError:
+            remaining.pop(0)
+            if not remaining:
+                raise ValueError("無法解碼CSV檔案，請檢查檔案編碼格式")
+
+
+def _content_hash(file_path):
+    """計算檔案內容的雜湊值"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_identity(file_path, use_content_hash=False):
+    """返回判斷檔案是否變更所用的識別值：(路徑, 大小, 修改時間) 或 (大小, 內容雜湊值)"""
+    stat = os.stat(file_path)
+    if use_content_hash:
+        return (stat.st_size, _content_hash(file_path))
+    return (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+
+
+def parse_cache_key(reader, file_path, args=(), kwargs=None, use_content_hash=False):
+    """依讀取函式、參數與檔案狀態產生快取鍵
+
+    預設以路徑、檔案大小與修改時間判斷檔案是否變更；use_content_hash 為 True 時改用檔案內容的雜湊值，
+    檔案被複製或修改時間改變但內容相同時仍可使用快取。
+    """
+    identity = file_identity(file_path, use_content_hash)
+    reader_name = f"{getattr(reader, '__module__', '')}.{getattr(reader, '__qualname__', repr(reader))}"
+    options = (reader_name, args, sorted((kwargs or {}).items()), pd.__version__)
+    return hashlib.sha1(repr((identity, options)).encode('utf-8')).hexdigest()
+
+
+def _evict_parse_cache(cache_dir, max_bytes):
+    """刪除最久未使用的快取檔案，直到總大小不超過上限"""
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return
+    entries = []
+    for name in names:
+        if not name.endswith(PARSE_CACHE_SUFFIX):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        _remove_quietly(path)
+        total -= size
+
+
+def cached_read(reader, file_path, *args, use_content_hash=False, cache_dir=None, **kwargs):
+    """以 reader(file_path, *args, **kwargs) 讀取檔案，並快取解析結果
+
+    檔案未變更時直接載入快取的 DataFrame；快取目錄無法使用時直接讀取原始檔案。
+    讀取失敗（例如編碼錯誤）時不會建立快取，例外照常拋出。
+    """
+    if not PARSE_CACHE_ENABLED:
+        return reader(file_path, *args, **kwargs)
+
+    cache_dir = cache_dir or PARSE_CACHE_DIR
+    try:
+        key = parse_cache_key(reader, file_path, args, kwargs, use_content_hash)
+    except OSError:
+        return reader(file_path, *args, **kwargs)
+    cache_path = os.path.join(cache_dir, key + PARSE_CACHE_SUFFIX)
+
+    try:
+        with open(cache_path, 'rb') as fh:
+            df = pickle.load(fh)
+        os.utime(cache_path)  # 更新使用時間，作為淘汰順序的依據
+        return df
+    except FileNotFoundError:
+        pass
+    except Exception:
+        _remove_quietly(cache_path)  # 快取損毀或版本不相容時重新解析
+
+    df = reader(file_path, *args, **kwargs)
+
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(temp_path, 'wb') as fh:
+            pickle.dump(df, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+        _evict_parse_cache(cache_dir, PARSE_CACHE_MAX_BYTES)
+    except (OSError, pickle.PicklingError):
+        _remove_quietly(temp_path)
+    return df
+
+
+def clear_parse_cache(cache_dir=None):
+    """刪除所有解析快取"""
+    _evict_parse_cache(cache_dir or PARSE_CACHE_DIR, 0)
+
+
+def read_table(excel_path, **read_excel_kwargs):
+    """讀取 Excel 檔案，若有可用的 Parquet 附屬檔則改讀附屬檔，否則使用解析快取"""
+    path = find_sidecar(excel_path)
+    if path is not None:
+        try:
+            return pd.read_parquet(path)
+        except (OSError, ValueError, pa.ArrowException):
+            pass  # 附屬檔損毀時改讀 Excel
+    return cached_read(pd.read_excel, excel_path, **read_excel_kwargs)
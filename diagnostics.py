@@ -0,0 +1,113 @@
+"""
+共用的診斷訊息機制
+訊息可以是 callable 或 %-格式字串加參數，只有在該級別確實會輸出時才計算與格式化；
+輸出到終端機與記錄檔的工作由背景執行緒負責，處理流程不會因為寫入而停頓
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+# 診斷訊息的詳細程度：0=無輸出，1=重要訊息，2=詳細訊息；可用環境變數 AH_DEBUG_LEVEL 設定預設值
+DEFAULT_DEBUG_LEVEL = int(os.environ.get("AH_DEBUG_LEVEL", "1"))
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# 已建立的 (QueueHandler, 輸出 handler 列表, QueueListener)
+_sinks = []
+
+
+def logging_level(debug_level):
+    """將 0/1/2 的詳細程度轉為 logging 的級別"""
+    if debug_level >= 2:
+        return logging.DEBUG
+    if debug_level >= 1:
+        return logging.INFO
+    return logging.WARNING
+
+
+class LazyMessage:
+    """延遲計算的訊息，輸出時才呼叫函式取得內容"""
+
+    def __init__(self, func):
+        self.func = func
+
+    def __str__(self):
+        return str(self.func())
+
+
+def render(message, args=()):
+    """取得訊息文字：callable 會被呼叫，有參數時以 % 格式化"""
+    if callable(message):
+        message = message()
+    message = str(message)
+    return message % args if args else message
+
+
+def _start_listener(log_queue, handlers):
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def get_logger(name, fmt=LOG_FORMAT, log_file=None, stream=None, debug_level=DEFAULT_DEBUG_LEVEL):
+    """返回以背景執行緒輸出的 logger，同名的 logger 只設定一次
+
+    參數:
+        name: logger 名稱
+        fmt: 輸出格式
+        log_file: 另外寫入的除錯記錄檔路徑，只在 debug_level 為 2 時建立與寫入；None 表示只輸出到終端機
+        stream: 終端機輸出，預設為 sys.stdout
+        debug_level: 0/1/2 的詳細程度，見 logging_level
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(logging_level(debug_level))
+    if any(isinstance(handler, logging.handlers.QueueHandler) for handler in logger.handlers):
+        return logger
+
+    formatter = logging.Formatter(fmt)
+    handlers = [logging.StreamHandler(stream or sys.stdout)]
+    if log_file and debug_level >= 2:
+        handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # QueueHandler 在呼叫端的執行緒組成訊息（LazyMessage 也在此時計算），寫入交給 QueueListener
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    logger.addHandler(queue_handler)
+    logger.propagate = False
+    _sinks.append((queue_handler, handlers, _start_listener(log_queue, handlers)))
+    return logger
+
+
+def set_debug_level(logger, debug_level):
+    """調整 logger 的詳細程度"""
+    logger.setLevel(logging_level(debug_level))
+
+
+def flush_logs():
+    """等待背景執行緒寫完目前所有訊息"""
+    for index, (queue_handler, handlers, listener) in enumerate(_sinks):
+        listener.stop()
+        _sinks[index] = (queue_handler, handlers, _start_listener(queue_handler.queue, handlers))
+
+
+def _stop_all():
+    for _, _, listener in _sinks:
+        listener.stop()
+
+
+def _restart_in_child():
+    """fork 出的子程序沒有背景執行緒，改用新的佇列與執行緒"""
+    for index, (queue_handler, handlers, _) in enumerate(_sinks):
+        queue_handler.queue = queue.SimpleQueue()
+        _sinks[index] = (queue_handler, handlers, _start_listener(queue_handler.queue, handlers))
+
+
+atexit.register(_stop_all)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_in_child)
@@ -0,0 +1,199 @@
+"""
+Excel 輸出引擎
+供 01_split-Excel.py 與 02_Filter.py 共用
+"""
+
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+
+from cancellation import ProcessingCancelled, check_cancelled
+
+# 標準引擎：透過 pd.ExcelWriter 在記憶體中建立完整活頁簿後再設定欄寬
+ENGINE_OPENPYXL = "openpyxl"
+# 低記憶體引擎：openpyxl 唯寫模式，先設定欄寬再逐列寫出
+ENGINE_WRITE_ONLY = "write_only"
+
+# GUI 下拉選單顯示名稱與引擎的對應
+OUTPUT_ENGINES = {
+    "標準 (openpyxl)": ENGINE_OPENPYXL,
+    "低記憶體串流 (write-only)": ENGINE_WRITE_ONLY,
+}
+
+# 低記憶體引擎每次轉換的列數
+WRITE_CHUNK_ROWS = 50000
+
+# 欄寬計算方式：split 為 01_split-Excel.py 的規則，filter 為 02_Filter.py 的規則
+WIDTH_STYLE_SPLIT = "split"
+WIDTH_STYLE_FILTER = "filter"
+
+CJK_PATTERN = '[\u4e00-\u9fff]'
+
+
+def iter_frame_chunks(data, chunk_rows=WRITE_CHUNK_ROWS):
+    """將 DataFrame 或 DataFrame 分塊的迭代器統一為分塊迭代器"""
+    if isinstance(data, pd.DataFrame):
+        for start in range(0, len(data), chunk_rows):
+            yield data.iloc[start:start + chunk_rows]
+        if len(data) == 0:
+            yield data
+    else:
+        yield from data
+
+
+@lru_cache(maxsize=1)
+def _digit_pattern():
+    """建立與 str.isdigit() 判斷一致的字元類別（包含①、²等字元）"""
+    ranges = []
+    start = prev = None
+    for code in range(0x110000):
+        if chr(code).isdigit():
+            if start is None:
+                start = code
+            elif code != prev + 1:
+                ranges.append((start, prev))
+                start = code
+            prev = code
+    ranges.append((start, prev))
+    # 直接使用字元本身，Python re 與 pyarrow 的 RE2 皆可解析
+    parts = ''.join(chr(a) if a == b else f'{chr(a)}-{chr(b)}' for a, b in ranges)
+    return f'[{parts}]'
+
+
+def _cell_text(series):
+    """將欄位轉為與 str(儲存格值) 相同的文字"""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        # 只轉換每個類別一次，再依類別編號展開，空值（編號 -1）為 str(nan)
+        labels = _cell_text(pd.Series(dtype.categories)).tolist() + [str(np.nan)]
+        table = np.array(labels, dtype=object)
+        return pd.Series(table[series.cat.codes.to_numpy()], index=series.index, dtype=object)
+    if (pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_object_dtype(dtype)
+            or pd.api.types.is_string_dtype(dtype)
+            or (isinstance(dtype, np.dtype) and dtype.kind in 'iuf')):
+        text = series.astype(str).astype(object)
+    else:
+        # 日期等其他型態的字串格式與 astype(str) 不同，逐一轉換
+        return pd.Series([str(value) for value in series], index=series.index, dtype=object)
+
+    # 部分 pandas 版本的 astype(str) 會保留空值，改用 str() 的結果（如 'nan'）
+    missing = text.isna()
+    if missing.any():
+        text[missing] = [str(value) for value in series[missing]]
+    return text
+
+
+def estimate_column_widths(data, style=WIDTH_STYLE_SPLIT, sample_rows=None):
+    """以向量化字串運算估算每個欄位的寬度
+
+    參數:
+        data: DataFrame
+        style: WIDTH_STYLE_SPLIT 或 WIDTH_STYLE_FILTER，分別對應兩個工具原本的欄寬規則
+        sample_rows: 只取前幾筆資料估算，None 表示使用全部資料
+    """
+    if sample_rows is not None:
+        data = data.head(sample_rows)
+
+    column_widths = []
+    for idx, col in enumerate(data.columns):
+        header_length = len(str(col))
+        text = _cell_text(data.iloc[:, idx])
+        lengths = text.str.len().to_numpy(dtype=np.int64)
+
+        if style == WIDTH_STYLE_FILTER:
+            # 中文字 2.5、數字與小數點 1.2、其他字元 1.5
+            cjk = text.str.count(CJK_PATTERN).to_numpy(dtype=np.int64)
+            digits = text.str.count(_digit_pattern()).to_numpy(dtype=np.int64)
+            dots = text.str.count(r'\.').to_numpy(dtype=np.int64)
+            numeric = digits + dots
+            # 以十分之一為單位整數運算，避免逐字累加的浮點誤差影響比較
+            tenths = 25 * cjk + 12 * numeric + 15 * (lengths - cjk - numeric)
+            col_width = float(header_length * 3)
+            if len(tenths):
+                col_width = max(col_width, float(tenths.max()) / 10)
+            column_widths.append(max(12, min(col_width, 60)))
+        else:
+            # 含中文字的儲存格 1.8 倍，其餘 1.4 倍
+            has_cjk = text.str.contains(CJK_PATTERN).to_numpy(dtype=bool)
+            col_width = max(header_length * 1.5, 12)
+            if len(lengths):
+                col_width = max(col_width, float((lengths * np.where(has_cjk, 1.8, 1.4)).max()))
+            column_widths.append(min(col_width + 2, 120))
+    return column_widths
+
+
+def write_excel(data, output_path, sheet_name, column_widths, engine=ENGINE_OPENPYXL, cancel_event=None):
+    """將資料寫成單一工作表的 Excel 檔案，並套用預先計算的欄位寬度
+
+    參數:
+        data: DataFrame，或 DataFrame 分塊的迭代器（低記憶體引擎可逐塊寫出）
+        output_path: 輸出檔案路徑
+        sheet_name: 工作表名稱
+        column_widths: 依欄位順序排列的欄寬
+        engine: ENGINE_OPENPYXL 或 ENGINE_WRITE_ONLY
+        cancel_event: 取消處理的 threading.Event，低記憶體引擎會在每一塊之間檢查
+    """
+    check_cancelled(cancel_event)
+    if engine == ENGINE_WRITE_ONLY:
+        _write_excel_write_only(data, output_path, sheet_name, column_widths, cancel_event)
+        return
+
+    if not isinstance(data, pd.DataFrame):
+        data = pd.concat(list(data), ignore_index=True)
+
+    try:
+        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+            # 分段寫入同一個工作表，讓取消要求可以在兩段之間生效
+            for start in range(0, max(len(data), 1), WRITE_CHUNK_ROWS):
+                check_cancelled(cancel_event)
+                data.iloc[start:start + WRITE_CHUNK_ROWS].to_excel(
+                    writer, index=False, sheet_name=sheet_name,
+                    header=(start == 0), startrow=0 if start == 0 else start + 1,
+                )
+
+            # 設置每個欄位的寬度
+            worksheet = writer.sheets[sheet_name]
+            for idx, width in enumerate(column_widths):
+                worksheet.column_dimensions[get_column_letter(idx + 1)].width = width
+    except ProcessingCancelled:
+        # ExcelWriter 結束時仍會存檔，取消時刪除不完整的檔案
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+
+
+def _write_excel_write_only(data, output_path, sheet_name, column_widths, cancel_event=None):
+    """以 openpyxl 唯寫模式逐列寫出，記憶體用量不隨列數增加"""
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(title=sheet_name)
+
+    # 唯寫模式必須在寫入任何資料列之前設定欄寬
+    for idx, width in enumerate(column_widths):
+        worksheet.column_dimensions[get_column_letter(idx + 1)].width = width
+
+    header_font = Font(bold=True)
+    header_written = False
+    for chunk in iter_frame_chunks(data):
+        # 取消時尚未呼叫 save()，不會留下輸出檔案
+        check_cancelled(cancel_event)
+        if not header_written:
+            header = []
+            for col in chunk.columns:
+                cell = WriteOnlyCell(worksheet, value=str(col))
+                cell.font = header_font
+                header.append(cell)
+            worksheet.append(header)
+            header_written = True
+
+        # 轉為 Python 物件並以 None 表示空值，與 to_excel 的空白儲存格一致
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            worksheet.append(row)
+
+    workbook.save(output_path)
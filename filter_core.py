@@ -0,0 +1,503 @@
+"""
+學生成績彙整的核心處理函式
+不依賴 tkinter，供 02_Filter.py 匯入使用；批次模式以多個程序同時彙整各學年度的活頁簿
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from cancellation import ProcessingCancelled, check_cancelled
+from course_schema import apply_course_schema, apply_summary_schema, format_memory, schema_memory_report
+from data_loader import read_table, write_sidecar
+from diagnostics import flush_logs, get_logger
+from excel_output import (
+    ENGINE_OPENPYXL, ENGINE_WRITE_ONLY, WIDTH_STYLE_FILTER, estimate_column_widths, write_excel,
+)
+from student_metrics import METRIC_COLUMNS, course_count_column, derive_student_metrics, score_std_column
+
+# 處理過程的訊息由背景執行緒寫到終端機，不會拖慢處理
+log = get_logger("filter_core", fmt="%(message)s")
+
+# 課程分類規則檔，可用環境變數 AH_COURSE_RULES 指定其他檔案
+COURSE_RULES_PATH = os.environ.get("AH_COURSE_RULES") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "course_rules.json")
+
+# 判斷課程類別用到的欄位，每種不重複的組合只判斷一次
+COURSE_KEY_COLUMNS = ("課程代碼", "課程名稱", "必選修")
+
+# 編譯後的分類規則：類別、課程代碼開頭、課程名稱、必選修包含的文字、是否只計一次完全相同的重複記錄
+CourseRule = namedtuple("CourseRule", ["category", "code_prefixes", "names", "type_keywords", "dedupe"])
+
+# 編譯後的規則表：輸出欄位（類別）順序、依序比對的規則群組、規則檔路徑
+CourseRules = namedtuple("CourseRules", ["categories", "groups", "source"])
+
+# 每位學生各課程類別的統計：平均成績、課程數、成績標準差
+CategoryStatistics = namedtuple("CategoryStatistics", ["averages", "counts", "stds"])
+
+# 彙整結果檔案名稱的後綴，批次模式尋找活頁簿時會略過已是彙整結果的檔案
+RESULT_SUFFIX = "_處理結果"
+
+# 批次模式的預設程序數，每個程序一次只載入一個學年度的資料
+DEFAULT_SUMMARY_WORKERS = os.cpu_count() or 1
+
+# 平行處理時檢查取消旗標的間隔（秒）
+CANCEL_POLL_SECONDS = 0.2
+
+
+def _report(progress, status_message, progress_value=None):
+    """透過回呼函式回報進度，progress 為 None 時不回報"""
+    if progress is not None:
+        progress(status_message, progress_value)
+
+
+def _text_list(rule, key):
+    """取得規則中的文字列表欄位，未設定時返回空的 tuple"""
+    values = rule.get(key, [])
+    if isinstance(values, str):
+        values = [values]
+    if not isinstance(values, list) or not all(isinstance(value, str) and value for value in values):
+        raise ValueError(f"課程分類規則的'{key}'必須是文字列表")
+    return tuple(values)
+
+
+def load_course_rules(path=None):
+    """讀取並編譯課程分類規則檔，格式錯誤時拋出 ValueError
+
+    規則檔的'規則群組'依序比對，課程歸入第一個有規則符合的群組中所有符合的類別；
+    同一規則內的 課程代碼開頭/課程名稱/必選修包含 條件符合任一即可。
+    """
+    path = path or COURSE_RULES_PATH
+    try:
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"找不到課程分類規則檔：{path}")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"課程分類規則檔格式錯誤（{path}）：{e}")
+
+    categories = _text_list(config, "輸出欄位")
+    groups = []
+    for group in config.get("規則群組", []):
+        compiled = []
+        for rule in group:
+            category = rule.get("類別")
+            if category not in categories:
+                raise ValueError(f"課程分類規則的類別'{category}'不在輸出欄位中")
+            compiled.append(CourseRule(
+                category=category,
+                code_prefixes=_text_list(rule, "課程代碼開頭"),
+                names=frozenset(_text_list(rule, "課程名稱")),
+                type_keywords=_text_list(rule, "必選修包含"),
+                dedupe=bool(rule.get("重複記錄只計一次", False)),
+            ))
+        groups.append(tuple(compiled))
+    if not categories or not any(groups):
+        raise ValueError(f"課程分類規則檔沒有任何類別或規則：{path}")
+    return CourseRules(list(categories), tuple(groups), path)
+
+
+def _rule_matches(rule, courses):
+    """返回每門課程是否符合規則的布林陣列；courses 為不重複課程的資料表，缺少的欄位視為不符合"""
+    matched = np.zeros(len(courses), dtype=bool)
+    if rule.code_prefixes and "課程代碼" in courses.columns:
+        matched |= courses["課程代碼"].str.startswith(rule.code_prefixes, na=False).to_numpy()
+    if rule.names and "課程名稱" in courses.columns:
+        matched |= courses["課程名稱"].isin(rule.names).to_numpy()
+    if rule.type_keywords and "必選修" in courses.columns:
+        for keyword in rule.type_keywords:
+            matched |= courses["必選修"].str.contains(keyword, regex=False, na=False).to_numpy()
+    return matched
+
+
+def _distinct_courses(df):
+    """以 課程代碼/課程名稱/必選修 的組合編號每筆記錄
+
+    返回 (course_ids, courses)：course_ids 為每筆記錄的課程編號，courses 為每個編號對應的不重複課程（文字欄位）。
+    各欄位先各自編碼（category 欄位直接使用其代碼），組合後的整數鍵再編碼一次，字串只在各欄位的不重複值上比較。
+    """
+    columns = [col for col in COURSE_KEY_COLUMNS if col in df.columns]
+    key = np.zeros(len(df), dtype=np.int64)
+    for col in columns:
+        codes, uniques = pd.factorize(df[col])
+        key = key * (len(uniques) + 1) + (codes + 1)  # 空值的代碼為 -1，加一後與其他值區分
+        key = pd.factorize(key)[0].astype(np.int64)
+    course_ids = key
+    first_rows = np.unique(course_ids, return_index=True)[1]
+    courses = df[columns].iloc[first_rows].astype(object).reset_index(drop=True)
+    return course_ids, courses
+
+
+def classify_courses(df, rules):
+    """判斷每筆課程記錄所屬的類別
+
+    返回 (筆數, 類別數) 的布林陣列，欄位順序同 rules.categories；一筆記錄可同時屬於多個類別
+    （例如課程代碼為 GE 開頭但課程名稱列為通識必修），各類別的平均都會計入。
+    規則只套用在不重複的課程上，再依課程編號對應回每筆記錄。
+    """
+    course_ids, courses = _distinct_courses(df)
+    log.debug("共 %d 門不重複課程", len(courses))
+
+    # 依序比對規則群組，已歸類的課程不再比對後面的群組
+    course_membership = np.zeros((len(courses), len(rules.categories)), dtype=bool)
+    unassigned = np.ones(len(courses), dtype=bool)
+    for group in rules.groups:
+        group_matched = np.zeros(len(courses), dtype=bool)
+        for rule in group:
+            matched = _rule_matches(rule, courses) & unassigned
+            course_membership[:, rules.categories.index(rule.category)] |= matched
+            group_matched |= matched
+        unassigned &= ~group_matched
+    membership = course_membership[course_ids]
+
+    # 依課程名稱判斷時，完全相同的記錄只保留第一筆；只比對屬於該類別的記錄
+    if "課程名稱" in df.columns:
+        for group in rules.groups:
+            for rule in group:
+                column = rules.categories.index(rule.category)
+                rows = np.flatnonzero(membership[:, column])
+                if rule.dedupe and rule.names and len(rows):
+                    membership[rows[df.iloc[rows].duplicated().to_numpy()], column] = False
+
+    # 各類別筆數只用於記錄訊息，未啟用 INFO 時不必計算
+    if log.isEnabledFor(logging.INFO):
+        for category, count in zip(rules.categories, membership.sum(axis=0)):
+            log.info("找到 %d 筆%s課程記錄", count, category)
+        log.info("未歸入任何類別的課程記錄 %d 筆", (~membership.any(axis=1)).sum())
+    return membership
+
+
+def compute_category_statistics(df, rules):
+    """計算每位學生各課程類別的平均成績、課程數與成績標準差（平均與標準差保留到小數點後兩位）
+
+    返回 CategoryStatistics，三個 DataFrame 皆以學號為索引、rules.categories 為欄位；
+    課程數只計有成績的記錄，與平均一致；只有一門課程時標準差為空值。
+    缺少必要欄位時所有類別皆為空值。
+    """
+    empty = pd.DataFrame(columns=rules.categories, dtype="float64")
+    if "課程代碼" not in df.columns or "成績" not in df.columns:
+        log.warning("警告: 找不到'課程代碼'或'成績'欄位，無法計算各類課程平均成績")
+        return CategoryStatistics(empty, empty, empty)
+    if "課程名稱" not in df.columns:
+        log.warning("警告: 找不到'課程名稱'欄位，無法依據課程名稱判斷課程類別")
+    if "必選修" not in df.columns:
+        log.warning("警告: 找不到'必選修'欄位，無法依據必選修判斷課程類別")
+
+    membership = classify_courses(df, rules)
+
+    # 學號只編碼一次，以 (學生, 類別) 的整數鍵一次分組計算所有統計量
+    student_codes, student_ids = pd.factorize(df["學號"])
+    n_categories = len(rules.categories)
+    positions, codes = np.nonzero(membership)
+    valid = student_codes[positions] >= 0
+    positions, codes = positions[valid], codes[valid]
+
+    # 成績以 float32 儲存，以 float64 計算
+    scores = df["成績"].to_numpy(dtype="float64", na_value=np.nan)[positions]
+    grouped = pd.Series(scores).groupby(student_codes[positions] * n_categories + codes).agg(["mean", "count", "std"])
+    keys = grouped.index.to_numpy()
+
+    def table(values, fill):
+        filled = np.full((len(student_ids), n_categories), fill, dtype=values.dtype)
+        filled.flat[keys] = values
+        return pd.DataFrame(filled, index=student_ids, columns=rules.categories)
+
+    return CategoryStatistics(
+        averages=table(grouped["mean"].to_numpy(), np.nan).round(2),
+        counts=table(grouped["count"].to_numpy(dtype=np.int64), 0),
+        stds=table(grouped["std"].to_numpy(), np.nan).round(2),
+    )
+
+
+def compute_column_widths(result_df):
+    """依欄位標題與內容計算每個欄位的寬度 (中文字2.5倍、數字1.2倍、其他1.5倍，介於12到60之間)"""
+    return estimate_column_widths(result_df, WIDTH_STYLE_FILTER)
+
+
+def result_path_for(excel_path):
+    """返回課程資料活頁簿對應的彙整結果路徑（同資料夾，檔名加上'_處理結果'）"""
+    stem = os.path.splitext(os.path.basename(excel_path))[0]
+    return os.path.join(os.path.dirname(excel_path), stem + RESULT_SUFFIX + ".xlsx")
+
+
+def build_student_summary(df, stage=None, rules=None):
+    """由課程資料建立學生彙整表：學院、科系、學號、各課程類別的平均成績、衍生指標與各類別課程數、標準差
+
+    stage(狀態訊息, 進度) 在每個階段開始前呼叫，可在其中檢查取消並更新進度；
+    rules 為 load_course_rules() 的結果，None 時讀取預設的規則檔。
+    """
+    stage = stage or (lambda status_message, progress_value=None: None)
+    rules = rules or load_course_rules()
+
+    # 檢查是否有學號欄位，這是必須的
+    stage("檢查必要欄位...", 15)
+    if "學號" not in df.columns:
+        raise ValueError("Excel檔案中找不到'學號'欄位，請確認資料格式")
+
+    # 先提取每個學號的基本資料（只保留每個學號的第一筆資料）
+    stage("提取基本資料...", 25)
+    student_info = df.drop_duplicates(subset=["學號"]).copy()
+    log.info("去重後剩下 %d 位學生", len(student_info))
+
+    # 建立必要的欄位並確保它們存在
+    stage("確認資料欄位結構...", 30)
+    needed_columns = ["學號"]
+
+    # 處理學院欄位
+    if "學院" in df.columns:
+        needed_columns.append("學院")
+    else:
+        # 如果不存在學院欄位，添加空白學院欄位
+        student_info["學院"] = ""
+        log.warning("警告: 找不到'學院'欄位，將使用空值")
+
+    # 處理科系欄位
+    stage("處理科系資訊...", 35)
+    if "學生系級" in df.columns:
+        needed_columns.append("學生系級")
+        # 只選取需要的欄位
+        student_info = student_info[needed_columns].copy()
+        # 將「學生系級」改名為「科系」
+        student_info = student_info.rename(columns={"學生系級": "科系"})
+    else:
+        # 只選取需要的欄位
+        student_info = student_info[needed_columns].copy()
+        # 如果不存在科系欄位，添加空白科系欄位
+        student_info["科系"] = ""
+        log.warning("警告: 找不到'學生系級'欄位，將使用空值")
+
+    # 如果有學院欄位，确保它出現在最前面
+    if "學院" in student_info.columns:
+        # 重新排列欄位，學院放第一位
+        cols = ["學院"]
+        for col in student_info.columns:
+            if col != "學院":
+                cols.append(col)
+        student_info = student_info[cols]
+
+    # 一次判斷每筆課程記錄的類別，再以一次分組計算各類別的平均成績、課程數與標準差
+    stage("判斷課程類別...", 50)
+    result_df = student_info.copy()
+    statistics = compute_category_statistics(df, rules)
+
+    stage("填入平均成績...", 75)
+    student_ids = result_df["學號"]
+    for category in rules.categories:
+        # 沒有該類課程的學生為 NaN，寫出 Excel 時為空白儲存格
+        result_df[category] = statistics.averages[category].reindex(student_ids).to_numpy()
+    for category in rules.categories:
+        counts = statistics.counts[category].reindex(student_ids, fill_value=0)
+        result_df[course_count_column(category)] = counts.to_numpy(dtype=np.int64)
+    for category in rules.categories:
+        result_df[score_std_column(category)] = statistics.stds[category].reindex(student_ids).to_numpy()
+
+    # 總體GPA、必修/選修平均等衍生指標以欄位運算一次算出，03/04 直接讀取
+    stage("計算衍生指標...", 80)
+    result_df = derive_student_metrics(result_df, rules.categories)
+
+    # 排序欄位順序為：學院、科系、學號、一般必修、一般選修、通識必修、通識選修、衍生指標、各類別課程數與標準差
+    stage("調整欄位順序...", 85)
+
+    # 確定要輸出的欄位順序
+    output_columns = []
+    if "學院" in result_df.columns:
+        output_columns.append("學院")
+    output_columns.extend(["科系", "學號"])
+
+    # 加入成績欄位，之後依序為衍生指標、各類別課程數與成績標準差
+    output_columns.extend(rules.categories)
+    output_columns.extend(METRIC_COLUMNS)
+    output_columns.extend(course_count_column(category) for category in rules.categories)
+    output_columns.extend(score_std_column(category) for category in rules.categories)
+
+    # 只保留指定欄位並按照指定順序排列
+    result_df = result_df[output_columns]
+
+    # 如果有學院欄位，按學院排序
+    stage("排序資料...", 90)
+    if "學院" in result_df.columns:
+        result_df = result_df.sort_values(by=["學院", "科系", "學號"])
+        log.info("已按學院、科系和學號排序")
+    else:
+        result_df = result_df.sort_values(by=["科系", "學號"])
+        log.info("已按科系和學號排序")
+    return apply_summary_schema(result_df, rules.categories)
+
+
+def summarize_workbook(excel_path, engine=ENGINE_OPENPYXL, progress=None, cancel_event=None, rules=None):
+    """彙整一個課程資料活頁簿，寫出'_處理結果.xlsx'與 Parquet 附屬檔，返回輸出路徑
+
+    參數:
+        excel_path: 課程資料檔案（01 輸出的學年度活頁簿或其他 Excel/CSV 檔案）
+        engine: Excel 輸出引擎
+        progress: 進度回呼函式 progress(狀態訊息, 進度)
+        cancel_event: 取消旗標，每個階段開始前檢查
+        rules: 課程分類規則，None 時讀取預設的規則檔
+    """
+    def stage(status_message, progress_value=None):
+        check_cancelled(cancel_event)
+        _report(progress, status_message, progress_value)
+
+    # 讀取原始 Excel 檔案
+    stage("正在讀取Excel檔案...", 10)
+    df = read_table(excel_path)
+    log.info("成功讀取Excel檔案，共有 %d 筆資料", len(df))
+    log.debug("檔案包含欄位: %s", df.columns.tolist())  # 列印所有欄位名稱進行調試
+    if log.isEnabledFor(logging.INFO):
+        df, memory_before, memory_after = schema_memory_report(df)
+        log.info("記憶體用量: %s → %s", format_memory(memory_before), format_memory(memory_after))
+    else:
+        df = apply_course_schema(df)
+
+    output_path = write_student_summary(df, result_path_for(excel_path), engine, stage, cancel_event, rules)
+    log.info("成功: 已處理Excel檔案並儲存至 %s", output_path)  # 在終端機列印成功訊息
+    return output_path
+
+
+def write_student_summary(df, output_path, engine=ENGINE_OPENPYXL, stage=None, cancel_event=None, rules=None):
+    """由已載入的課程資料建立學生彙整表，寫出 Excel 與 Parquet 附屬檔，返回輸出路徑
+
+    供 summarize_workbook 與 01 的合併流程（split_core.run_split 的 summary_only 模式）共用，
+    後者直接傳入記憶體中的學年度資料，不需先寫出再讀回學年度活頁簿。
+    """
+    stage = stage or (lambda status_message, progress_value=None: check_cancelled(cancel_event))
+    result_df = build_student_summary(df, stage, rules)
+
+    # 儲存新的 Excel 檔案
+    stage("正在儲存結果...", 95)
+
+    # 先計算欄位寬度，再依所選引擎寫出
+    write_excel(result_df, output_path, '處理結果', compute_column_widths(result_df), engine=engine,
+                cancel_event=cancel_event)
+
+    # 另存 Parquet 附屬檔，供 T-test 與相關性分析程式快速載入
+    if write_sidecar(result_df, output_path) is None:
+        log.info("未建立 Parquet 附屬檔，後續分析將讀取 Excel 檔案")
+    return output_path
+
+
+def _summarize_in_worker(excel_path, engine, rules):
+    """子程序中執行的彙整工作；結束前寫出背景執行緒中的訊息，避免程序結束時遺失"""
+    try:
+        return summarize_workbook(excel_path, engine, rules=rules)
+    finally:
+        flush_logs()
+
+
+def find_year_workbooks(output_root):
+    """尋找 01 輸出資料夾（處理結果_時間戳）中的各學年度課程資料活頁簿
+
+    搜尋資料夾本身與其下一層子資料夾，略過已是彙整結果的檔案與 Excel 的暫存檔，返回排序後的路徑列表。
+    """
+    if not os.path.isdir(output_root):
+        raise FileNotFoundError(f"找不到資料夾：{output_root}")
+
+    folders = [output_root] + sorted(
+        os.path.join(output_root, entry) for entry in os.listdir(output_root)
+        if os.path.isdir(os.path.join(output_root, entry))
+    )
+    workbooks = []
+    for folder in folders:
+        for name in sorted(os.listdir(folder)):
+            stem, ext = os.path.splitext(name)
+            if ext.lower() not in (".xlsx", ".xls") or name.startswith("~$") or stem.endswith(RESULT_SUFFIX):
+                continue
+            workbooks.append(os.path.join(folder, name))
+    return workbooks
+
+
+def summarize_year_workbooks(workbook_paths, max_workers=DEFAULT_SUMMARY_WORKERS, engine=ENGINE_OPENPYXL,
+                             progress=None, cancel_event=None, rules=None):
+    """批次彙整多個活頁簿，每個活頁簿在各自的程序中處理
+
+    分類規則只讀取一次，再傳給各個程序，批次中的所有活頁簿使用同一份規則。
+
+    每完成一個活頁簿即回報整體進度，返回依完成順序排列的輸出路徑。
+    取消時尚未開始的活頁簿不再處理，並拋出 ProcessingCancelled；已在子程序中執行的活頁簿會先完成。
+    """
+    total = len(workbook_paths)
+    output_paths = []
+    if total == 0:
+        return output_paths
+    rules = rules or load_course_rules()
+
+    def report_done(output_path):
+        output_paths.append(output_path)
+        done = len(output_paths)
+        _report(progress, f"已完成 {os.path.basename(output_path)} ({done}/{total})...", 5 + done / total * 95)
+
+    max_workers = max(1, min(max_workers, total))
+    if max_workers == 1:
+        # 單一程序時直接在目前程序處理，省去啟動子程序的成本
+        for excel_path in workbook_paths:
+            check_cancelled(cancel_event)
+            _report(progress, f"正在處理 {os.path.basename(excel_path)}...")
+            report_done(summarize_workbook(excel_path, engine, cancel_event=cancel_event, rules=rules))
+        return output_paths
+
+    log.info("使用 %d 個程序平行處理 %d 個活頁簿", max_workers, total)
+    _report(progress, f"正在處理 {total} 個活頁簿...", 5)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = {executor.submit(_summarize_in_worker, excel_path, engine, rules) for excel_path in workbook_paths}
+        while pending:
+            # 定時喚醒以檢查是否已要求取消
+            done, pending = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            for future in done:
+                report_done(future.result())  # 子程序中的錯誤在此重新拋出
+            if cancel_event is not None and cancel_event.is_set():
+                for future in pending:
+                    future.cancel()
+                check_cancelled(cancel_event)
+    return output_paths
+
+
+def _print_progress(status_message, progress_value=None):
+    """命令列模式的進度輸出"""
+    if progress_value is not None:
+        log.info("[%5.1f%%] %s", progress_value, status_message)
+
+
+def main(argv=None):
+    """命令列進入點，不需要 tkinter 與顯示器，可一次彙整 01 輸出的所有學年度"""
+    parser = argparse.ArgumentParser(description="彙整學生各類課程平均成績（命令列版本，不啟動 GUI）")
+    parser.add_argument("paths", nargs="+", help="課程資料活頁簿，或 01 輸出的'處理結果_時間戳'資料夾")
+    parser.add_argument("--workers", type=int, default=DEFAULT_SUMMARY_WORKERS,
+                        help=f"平行處理的程序數（預設 {DEFAULT_SUMMARY_WORKERS}）")
+    parser.add_argument("--engine", choices=[ENGINE_OPENPYXL, ENGINE_WRITE_ONLY], default=ENGINE_OPENPYXL,
+                        help="Excel 輸出引擎")
+    parser.add_argument("--rules", help=f"課程分類規則檔（預設 {os.path.basename(COURSE_RULES_PATH)}）")
+    args = parser.parse_args(argv)
+
+    try:
+        workbook_paths = []
+        for path in args.paths:
+            workbook_paths.extend(find_year_workbooks(path) if os.path.isdir(path) else [path])
+        if not workbook_paths:
+            raise FileNotFoundError("找不到需要彙整的活頁簿")
+        output_paths = summarize_year_workbooks(workbook_paths, max_workers=max(1, args.workers),
+                                                engine=args.engine, progress=_print_progress,
+                                                rules=load_course_rules(args.rules))
+    except (KeyboardInterrupt, ProcessingCancelled):
+        flush_logs()
+        print("已中斷處理", file=sys.stderr)
+        return 130
+    except (ValueError, FileNotFoundError) as e:
+        flush_logs()
+        print(f"錯誤：{e}", file=sys.stderr)
+        return 1
+    # 先輸出背景執行緒中尚未寫出的訊息，最後才列出輸出檔案
+    flush_logs()
+    for output_path in output_paths:
+        print(output_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+以充分統計量進行的群組間獨立樣本 t-test
+各 (群組, 欄位) 的筆數、平均與變異數以一次分組計算，所有群組配對的 t 統計量與 p 值再以向量運算一次得出，
+不需要為每個配對重新掃描資料；結果與逐對呼叫 scipy.stats.ttest_ind（假設變異數相等）相同
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# 獨立樣本 t-test 每組至少需要的有效筆數
+MIN_GROUP_SIZE = 2
+
+
+def group_statistics(data, group_column, value_columns):
+    """計算每個 (群組, 欄位) 的有效筆數 n、平均 mean 與樣本變異數 var（ddof=1），空值不計入
+
+    返回以 (群組, 欄位) 為索引的 DataFrame；群組欄位為空值的記錄不屬於任何群組。
+    """
+    long = data[[group_column, *value_columns]].melt(id_vars=group_column, var_name='column', value_name='value')
+    grouped = long.dropna().groupby([group_column, 'column'], observed=True, sort=False)['value']
+    return grouped.agg(n='count', mean='mean', var='var')
+
+
+def group_pairs(groups):
+    """依序排列的群組中所有 (前者, 後者) 的配對"""
+    return [(groups[i], groups[j]) for i in range(len(groups)) for j in range(i + 1, len(groups))]
+
+
+def pairwise_ttests(statistics, pairs, value_columns):
+    """由 group_statistics 的結果計算每個配對在每個欄位的獨立樣本 t-test
+
+    返回 DataFrame，每列為一個 (group1, group2, column)，依 pairs 與 value_columns 的順序排列，欄位包含
+    n1/mean1/std1、n2/mean2/std2（std 為母體標準差，同 np.std）、statistic 與 p_value；
+    任一組少於 MIN_GROUP_SIZE 筆時 statistic 與 p_value 為 NaN。
+    """
+    rows = pd.DataFrame([(g1, g2, col) for g1, g2 in pairs for col in value_columns],
+                        columns=['group1', 'group2', 'column'])
+
+    def side(group_key):
+        keys = pd.MultiIndex.from_arrays([rows[group_key], rows['column']])
+        side_stats = statistics.reindex(keys)
+        return (side_stats['n'].fillna(0).to_numpy(dtype=np.int64), side_stats['mean'].to_numpy(dtype=np.float64),
+                side_stats['var'].to_numpy(dtype=np.float64))
+
+    n1, mean1, var1 = side('group1')
+    n2, mean2, var2 = side('group2')
+    rows['n1'], rows['mean1'], rows['n2'], rows['mean2'] = n1, mean1, n2, mean2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rows['std1'] = np.sqrt(var1 * (n1 - 1) / n1)
+        rows['std2'] = np.sqrt(var2 * (n2 - 1) / n2)
+
+    statistic = np.full(len(rows), np.nan)
+    p_value = np.full(len(rows), np.nan)
+    enough = (n1 >= MIN_GROUP_SIZE) & (n2 >= MIN_GROUP_SIZE)
+    if enough.any():
+        result = stats.ttest_ind_from_stats(mean1[enough], np.sqrt(var1[enough]), n1[enough],
+                                            mean2[enough], np.sqrt(var2[enough]), n2[enough], equal_var=True)
+        statistic[enough] = result.statistic
+        p_value[enough] = result.pvalue
+    rows['statistic'] = statistic
+    rows['p_value'] = p_value
+    return rows
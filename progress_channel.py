@@ -0,0 +1,84 @@
+"""
+GUI 共用的進度事件通道
+背景執行緒只把事件放進佇列，主執行緒以 root.after() 固定頻率取出並更新 Tk 元件，
+Tk 只會在主執行緒中被呼叫，背景工作也不會因為等待重繪而停頓
+"""
+
+import queue
+import time
+
+# 每個畫格的間隔（毫秒），約每秒更新 20 次
+FRAME_INTERVAL_MS = 50
+
+
+class ProgressChannel:
+    """背景執行緒與 Tk 主迴圈之間的事件佇列
+
+    call() 的事件依序全部執行；update() 的事件以 key 合併，同一個畫格內只執行最後一次，
+    適合狀態文字與進度條這類只需要顯示最新值的更新。
+    """
+
+    def __init__(self, root, interval_ms=FRAME_INTERVAL_MS):
+        self.root = root
+        self.interval_ms = interval_ms
+        self._events = queue.SimpleQueue()
+        self._after_id = None
+        self._last_pump = 0.0
+
+    def start(self):
+        """開始以固定頻率處理事件，需在主執行緒呼叫"""
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        """停止定時處理，尚未處理的事件保留在佇列中"""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def call(self, func, *args, **kwargs):
+        """在主執行緒執行 func(*args, **kwargs)，可由任何執行緒呼叫"""
+        self._events.put((None, func, args, kwargs))
+
+    def update(self, key, func, *args, **kwargs):
+        """同 call()，但同一個 key 在一個畫格內只執行最後一次"""
+        self._events.put((key, func, args, kwargs))
+
+    def drain(self):
+        """立即處理佇列中所有事件，需在主執行緒呼叫；返回執行的事件數"""
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                break
+
+        # 以 key 合併的事件只保留最後一次，並在最後一次出現的位置執行
+        last_index = {event[0]: index for index, event in enumerate(events) if event[0] is not None}
+        executed = 0
+        for index, (key, func, args, kwargs) in enumerate(events):
+            if key is not None and last_index[key] != index:
+                continue
+            func(*args, **kwargs)
+            executed += 1
+        return executed
+
+    def pump(self, widget=None):
+        """主執行緒自行執行長時間工作時呼叫，距離上次重繪超過一個畫格才處理事件並重繪
+
+        返回是否有重繪。widget 預設為 root，也可以傳入進度視窗等 Toplevel。
+        """
+        now = time.monotonic()
+        if now - self._last_pump < self.interval_ms / 1000:
+            return False
+        self._last_pump = now
+        self.drain()
+        (widget or self.root).update()
+        return True
+
+    def _tick(self):
+        self._after_id = None
+        try:
+            self.drain()
+        finally:
+            self._after_id = self.root.after(self.interval_ms, self._tick)
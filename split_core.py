@@ -0,0 +1,1038 @@
+"""
+學籍資料切割工具的核心處理函式
+不依賴 tkinter，供 01_split-Excel.py 匯入使用
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+from collections import OrderedDict, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from cancellation import ProcessingCancelled, check_cancelled
+from course_schema import STUDENT_ID_COLUMN, STUDENT_ID_DTYPE, apply_course_schema, format_memory, schema_memory_report
+from diagnostics import DEFAULT_DEBUG_LEVEL, flush_logs, get_logger, render
+from filter_core import load_course_rules, result_path_for, write_student_summary
+from data_loader import (
+    SIDECAR_SUFFIX, SidecarChunkWriter, cached_read, excel_equivalent, read_csv_sniffed, sniff_csv, write_sidecar,
+)
+from student_store import STUDENT_STORE_ENABLED, StudentStore
+from excel_output import (
+    ENGINE_OPENPYXL, ENGINE_WRITE_ONLY, WIDTH_STYLE_SPLIT, WRITE_CHUNK_ROWS,
+    estimate_column_widths, write_excel,
+)
+
+# 調試級別設定：0=無輸出，1=重要訊息，2=詳細訊息；預設值可用環境變數 AH_DEBUG_LEVEL 設定
+DEBUG_LEVEL = DEFAULT_DEBUG_LEVEL
+
+# print_debug 的輸出由背景執行緒寫到終端機，是否輸出由 DEBUG_LEVEL 決定
+_log = get_logger("split_core", fmt="[%(levelname)s] %(message)s", debug_level=2)
+
+# 串流模式下每次讀取的CSV列數
+CSV_CHUNK_SIZE = 200000
+
+# 計算欄寬時取樣的資料筆數
+WIDTH_SAMPLE_ROWS = 1000
+
+# 平行寫入時檢查取消要求的間隔秒數
+CANCEL_POLL_SECONDS = 0.2
+
+# 增量模式使用的輸出清單檔名與格式版本
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# 平行寫入各學年度活頁簿的預設程序數（每個程序會在記憶體中建立一份活頁簿）
+DEFAULT_WRITER_WORKERS = min(4, os.cpu_count() or 1)
+
+
+class InputFormatError(Exception):
+    """輸入檔案缺少必要欄位或格式不符時拋出"""
+
+
+class BasicDataError(Exception):
+    """讀取或合併基本資料時發生非預期錯誤時拋出，訊息可直接顯示給使用者"""
+
+
+# run_split 的處理結果：輸出資料夾、所有學年度、沿用先前輸出的學年度
+SplitResult = namedtuple("SplitResult", ["output_path", "processed_years", "reused_years"])
+
+
+def debug_enabled(level):
+    """此級別的診斷訊息是否會輸出，用於略過只為診斷而做的計算"""
+    return DEBUG_LEVEL >= level
+
+
+def print_debug(message, *args, level=1):
+    """輸出診斷訊息到終端機
+
+    參數:
+        message: 要輸出的訊息；可為 callable（只在確實輸出時呼叫），或搭配 args 的 %-格式字串
+        level: 訊息重要性級別 (1=重要訊息, 2=詳細訊息)
+    """
+    if DEBUG_LEVEL >= level:
+        _log.log(logging.INFO if level == 1 else logging.DEBUG, render(message, args))
+
+
+def _report(progress, status_message, progress_value=None):
+    """若有提供進度回呼函式則回報進度"""
+    if progress is not None:
+        progress(status_message, progress_value)
+
+
+def get_academic_year(semester_code):
+    """根據開課學年期代碼（例如 1101）返回學年度字串（例如 110）。"""
+    if pd.isna(semester_code):
+        return "未知學期"
+    try:
+        code_str = str(int(semester_code)) # 確保是整數再轉字串，避免 .0
+        if len(code_str) >= 3:
+            return code_str[:3] # 取前三碼作為學年度
+    except ValueError: # 處理無法轉換為整數的情況，例如空字串或非數字字元
+        pass # 或者可以記錄錯誤或返回特定值
+    return "未知學期"
+
+
+def _get_semester(semester_code):
+    """返回開課學年期代碼中學年度之後的部分（例如 1101 返回 '1'），無法判斷者返回'未知學期'"""
+    if get_academic_year(semester_code) == "未知學期":
+        return "未知學期"
+    return str(int(semester_code))[3:] or "未知學期"
+
+
+def _labels_by_unique_values(codes, label_func):
+    """對每個不重複的值只呼叫一次 label_func，再依位置展開"""
+    value_codes, uniques = pd.factorize(codes)
+    return _expand_labels(value_codes, [label_func(value) for value in uniques])  # 空值的編號為 -1
+
+
+def _numeric_academic_year(numbers, with_semester):
+    """以數值運算取前三碼作為學年度，返回學年度與學期標籤陣列"""
+    # 只處理 0 以上且在浮點精確範圍內的值，其餘保留'未知學期'或另行判斷
+    fast = np.isfinite(numbers) & (numbers >= 100) & (numbers < 2 ** 53)
+    truncated = np.trunc(numbers[fast]).astype(np.int64)
+
+    # 依位數決定除數：四碼代碼除以 10，五碼代碼除以 100
+    powers = 10 ** np.arange(19, dtype=np.int64)
+    rest_digits = np.searchsorted(powers, truncated, side='right') - 3
+    divisors = powers[rest_digits]
+
+    # 先以整數編號表示標籤，最後一次展開成字串，避免逐列建立字串物件
+    label_codes = np.full(len(numbers), -1, dtype=np.int64)
+    year_codes, year_values = pd.factorize(truncated // divisors)
+    label_codes[fast] = year_codes
+    years = _expand_labels(label_codes, [str(value) for value in year_values])
+
+    semesters = None
+    if with_semester:
+        # 以位數與餘數組合成單一整數鍵，保留開頭的 0（例如 11001 的學期為 '01'）
+        rest_codes, rest_keys = pd.factorize(rest_digits * 10 ** 16 + truncated % divisors)
+        label_codes[fast] = rest_codes
+        semesters = _expand_labels(label_codes, [
+            str(key % 10 ** 16).zfill(key // 10 ** 16) if key >= 10 ** 16 else "未知學期"
+            for key in rest_keys
+        ])
+    return years, semesters
+
+
+def _expand_labels(label_codes, labels):
+    """依整數編號展開標籤，編號 -1 為'未知學期'"""
+    table = np.empty(len(labels) + 1, dtype=object)
+    table[:len(labels)] = labels
+    table[-1] = "未知學期"
+    return table[label_codes]
+
+
+def derive_academic_year(semester_codes, with_semester=False):
+    """向量化版本的 get_academic_year，返回學年度標籤 Series
+
+    數值欄位先取整數部分再以整數除法取前三碼（1101 → '110'），無法判斷者標記為'未知學期'。
+    文字或混合型態的欄位則對每個不重複的值呼叫 get_academic_year，結果與逐列 apply 相同。
+    with_semester 為 True 時另外返回學期標籤 Series（1101 → '1'）。
+    """
+    codes = pd.Series(semester_codes)
+    if isinstance(codes.dtype, pd.CategoricalDtype):
+        # category 欄位只需判斷每個類別一次，再依類別編號展開（編號 -1 為空值）
+        category_labels = derive_academic_year(pd.Series(codes.cat.categories), with_semester)
+        if not with_semester:
+            category_labels = (category_labels,)
+        value_codes = codes.cat.codes.to_numpy()
+        labels = [pd.Series(_expand_labels(value_codes, list(values)), index=codes.index, dtype=object)
+                  for values in category_labels]
+        return tuple(labels) if with_semester else labels[0]
+
+    if pd.api.types.is_numeric_dtype(codes.dtype) and not pd.api.types.is_bool_dtype(codes.dtype):
+        numbers = codes.to_numpy(dtype=float, na_value=np.nan)
+        years, semesters = _numeric_academic_year(numbers, with_semester)
+
+        # 負數與極大值的字串表示方式特殊，交由 get_academic_year 判斷
+        special = np.isfinite(numbers) & ((numbers < 0) | (numbers >= 2 ** 53))
+        if special.any():
+            years[special] = _labels_by_unique_values(codes[special], get_academic_year)
+            if with_semester:
+                semesters[special] = _labels_by_unique_values(codes[special], _get_semester)
+    else:
+        years = _labels_by_unique_values(codes, get_academic_year)
+        semesters = _labels_by_unique_values(codes, _get_semester) if with_semester else None
+
+    years = pd.Series(years, index=codes.index, dtype=object)
+    if with_semester:
+        return years, pd.Series(semesters, index=codes.index, dtype=object)
+    return years
+
+
+def get_year_output_names(year_group):
+    """返回學年度對應的 (資料夾名稱, 檔案名稱, 工作表名稱)"""
+    sheet_name_suffix = "資料"
+    if year_group == "未知學期":
+        return "未知學期資料", "未知學期資料.xlsx", f"未知學期{sheet_name_suffix}"
+    return (f"{year_group}學年度",
+            f"{year_group}學年度課程資料.xlsx",
+            f"{year_group}學年度{sheet_name_suffix}")
+
+
+def check_main_columns(columns):
+    """檢查主檔案是否包含必要欄位"""
+    if '開課學年期' not in columns:
+        raise InputFormatError("檔案中找不到 '開課學年期' 欄位！")
+    if '學號' not in columns:
+        raise InputFormatError("主檔案中找不到 '學號' 欄位！")
+
+
+def load_basic_data(basic_data_path, progress=None, with_level=False):
+    """讀取基本資料檔案，返回只含 學號/學院（必要時含附屬學院）且學號不重複的資料框架
+
+    with_level 為 True 且基本資料有'學生系級'欄時一併保留，供寫入學生資料庫使用。
+    """
+    _report(progress, "開始讀取基本資料檔案...", 20)
+    print_debug(f"開始讀取基本資料檔案: {basic_data_path}", level=1)
+    print_debug(f"檔案副檔名檢查: 是否為CSV檔案? {basic_data_path.lower().endswith('.csv')}", level=2)
+
+    # 根據檔案類型使用不同讀取方法
+    if basic_data_path.lower().endswith('.csv'):
+        print_debug("識別為CSV檔案，使用read_csv讀取", level=1)
+        _report(progress, "讀取CSV基本資料檔案中...", 25)
+        # 由檔案開頭判斷編碼、分隔符號與標題列位置，再一次讀取整個檔案
+        csv_format = sniff_csv(basic_data_path)
+        print_debug("CSV格式: 編碼=%s, 分隔符號=%r, 略過前%d行",
+                    csv_format.encoding, csv_format.delimiter, csv_format.header_row, level=2)
+        basic_df = cached_read(read_csv_sniffed, basic_data_path, dtype=str)
+        print_debug(lambda: f"讀取後的欄位: {basic_df.columns.tolist()}", level=2)
+    elif basic_data_path.lower().endswith(('.xlsx', '.xls')):
+        print_debug("識別為Excel檔案，使用read_excel讀取", level=1)
+        _report(progress, "讀取Excel基本資料檔案中...", 25)
+        basic_df = cached_read(pd.read_excel, basic_data_path, dtype=str)
+    else:
+        print_debug(f"無法識別的檔案類型: {basic_data_path}，嘗試作為CSV讀取", level=1)
+        _report(progress, f"無法識別的檔案類型，嘗試作為CSV讀取", 25)
+        basic_df = cached_read(read_csv_sniffed, basic_data_path, dtype=str)
+
+    _report(progress, "檢查基本資料欄位...", 30)
+    print_debug(lambda: f"基本資料檔案欄位: {basic_df.columns.tolist()}", level=2)
+
+    # 檢查'學  號'欄位是否存在，考慮空白字符問題
+    student_id_column_name = None
+
+    for col in basic_df.columns:
+        # 輸出欄位名稱及其ASCII代碼，用於診斷
+        print_debug(lambda: f"欄位: '{col}' ASCII: {[ord(c) for c in col]}", level=2)
+
+        # 嘗試多種匹配方式
+        if (col.strip() == '學號' or
+            '學號' in col.strip() or
+            '學號' in col.replace(' ', '') or
+            col.strip() == '學  號' or
+            '學  號' in col):
+            student_id_column_name = col
+            print_debug(f"找到學號欄位: '{col}'", level=1)
+            break
+
+    if student_id_column_name is None:
+        raise InputFormatError("基本資料檔案中找不到含有'學號'的欄位！")
+
+    if '學院' not in basic_df.columns:
+        raise InputFormatError("基本資料檔案中找不到 '學院' 欄位！")
+
+    # 只保留學院欄位
+    _report(progress, "準備合併資料...", 35)
+    print_debug(f"使用欄位 '{student_id_column_name}' 進行合併", level=1)
+    selected_columns = [student_id_column_name, '學院']
+    if with_level and '學生系級' in basic_df.columns:
+        selected_columns.append('學生系級')
+    basic_df_selected = basic_df[selected_columns]
+
+    # 輸出一些原始資料樣本
+    print_debug(lambda: f"基本資料前5筆: \n{basic_df_selected.head(5)}", level=2)
+
+    # 重命名欄位以便合併
+    basic_df_selected = basic_df_selected.rename(columns={student_id_column_name: '學號'})
+
+    # 基本資料以文字讀取，學號與檔案內容一致；學號空白的列無法合併，直接略過
+    _report(progress, "處理學號格式...", 40)
+    basic_df_selected = basic_df_selected.dropna(subset=['學號'])
+
+    # 檢查基本資料中的重複
+    _report(progress, "檢查重複學號...", 45)
+    basic_dup_ids = basic_df_selected['學號'].value_counts()
+    basic_dup_ids = basic_dup_ids[basic_dup_ids > 1]
+    if not basic_dup_ids.empty:
+        print_debug(lambda: f"基本資料中有重複學號，前5筆: \n{basic_dup_ids.head(5)}", level=2)
+
+        # 處理基本資料中的重複學號
+        _report(progress, "處理基本資料中的重複學號...", 50)
+        print_debug("處理基本資料中的重複學號...", level=1)
+        basic_df_selected = resolve_duplicate_colleges(basic_df_selected)
+        print_debug(f"處理後基本資料筆數: {len(basic_df_selected)}", level=1)
+        print_debug(lambda: f"處理後基本資料範例:\n{basic_df_selected.head()}", level=2)
+
+    # 合併資料前，確保沒有重複的學號
+    _report(progress, "進行最終檢查...", 60)
+    if len(basic_df_selected) != len(basic_df_selected['學號'].unique()):
+        print_debug("警告：處理後的基本資料仍有重複學號", level=1)
+
+    return basic_df_selected
+
+
+def load_student_dimension(basic_data_path, progress=None, use_store=STUDENT_STORE_ENABLED):
+    """取得合併用的學生資料
+
+    基本資料檔案（依路徑、大小與修改時間判斷）已匯入學生資料庫時直接由資料庫載入；否則以 load_basic_data
+    讀取後匯入資料庫，只新增或更新內容有變更的學號，並刪除最久未使用的基本資料（見 StudentStore.prune）。
+    只返回此基本資料檔案的學生（與直接讀取該檔案相同），不包含先前匯入的其他基本資料。
+    資料庫無法使用時改為只使用本次的基本資料檔案。
+    """
+    if not use_store:
+        return load_basic_data(basic_data_path, progress=progress)
+
+    try:
+        store = StudentStore()
+    except (sqlite3.Error, OSError) as e:
+        print_debug(f"無法開啟學生資料庫，直接讀取基本資料檔案: {e}", level=1)
+        return load_basic_data(basic_data_path, progress=progress)
+
+    with store:
+        roster_key = store.roster_key(basic_data_path)
+        if store.has_roster(roster_key):
+            _report(progress, "由學生資料庫載入基本資料...", 30)
+            print_debug(f"基本資料檔案已匯入學生資料庫，略過解析: {store.db_path}", level=1)
+            return store.load(roster_key)
+
+        basic_df_selected = load_basic_data(basic_data_path, progress=progress, with_level=True)
+        try:
+            changed = store.import_roster(roster_key, basic_data_path, basic_df_selected)
+            pruned = store.prune()
+        except sqlite3.Error as e:
+            print_debug(f"寫入學生資料庫失敗，只使用本次的基本資料: {e}", level=1)
+            return basic_df_selected.drop(columns=['學生系級'], errors='ignore')
+        print_debug(f"已匯入學生資料庫，共 {store.student_count(roster_key)} 個學號，其中 {changed} 個新增或變更", level=1)
+        if pruned:
+            print_debug(f"已從學生資料庫刪除 {pruned} 份最久未使用的基本資料", level=1)
+        return store.load(roster_key)
+
+
+def resolve_duplicate_colleges(basic_df_selected):
+    """合併同一學號的多筆基本資料
+
+    第一筆的學院作為主要學院，其餘不同的學院依出現順序去重後以逗號分隔
+    存入'附屬學院'欄；學號順序依第一次出現的順序。若有'學生系級'欄則取第一筆的值。
+    """
+    # 每個學號的第一筆即為主要學院
+    first_records = basic_df_selected.drop_duplicates(subset='學號', keep='first')
+
+    # 同一學號中第一次出現的 (學號, 學院) 組合，扣除每個學號的第一筆後即為附屬學院
+    distinct_colleges = basic_df_selected.drop_duplicates(subset=['學號', '學院'], keep='first')
+    subsidiary = distinct_colleges[distinct_colleges.duplicated(subset='學號', keep='first')]
+    subsidiary = subsidiary.dropna(subset=['學院'])
+
+    multi_college_ids = subsidiary['學號'].unique()
+    if len(multi_college_ids) > 0:
+        print_debug(f"共有 {len(multi_college_ids)} 個學號有多個不同學院", level=1)
+
+    subsidiary_map = subsidiary.groupby('學號', sort=False)['學院'].agg(','.join)
+
+    resolved = pd.DataFrame({
+        '學號': first_records['學號'].to_numpy(),
+        '學院': first_records['學院'].to_numpy(),
+        '附屬學院': first_records['學號'].map(subsidiary_map).fillna('').to_numpy(),
+    })
+    if '學生系級' in first_records.columns:
+        resolved['學生系級'] = first_records['學生系級'].to_numpy()
+    return resolved
+
+
+def compact_course_table(df, label):
+    """套用共用欄位型態（見 course_schema），DEBUG_LEVEL >= 1 時回報轉換前後的記憶體用量"""
+    if DEBUG_LEVEL < 1:
+        return apply_course_schema(df)
+    df, before, after = schema_memory_report(df)
+    print_debug(f"{label}記憶體用量: {format_memory(before)} → {format_memory(after)}", level=1)
+    return df
+
+
+def _debug_duplicate_ids(df, basic_df_selected):
+    """輸出主檔案與基本資料的重複學號及樣本，僅供詳細診斷使用"""
+    print_debug(lambda: f"主檔案中學號為11057272的記錄數: {df[df['學號'] == '11057272'].shape[0]}", level=2)
+    print_debug(lambda: f"基本資料中學號為11057272的記錄數: {basic_df_selected[basic_df_selected['學號'] == '11057272'].shape[0]}", level=2)
+
+    # 檢查學號的重複情況
+    dup_student_ids = df['學號'].value_counts()
+    dup_student_ids = dup_student_ids[dup_student_ids > 1]
+    if not dup_student_ids.empty:
+        print_debug(f"主檔案中有重複學號，前5筆: \n{dup_student_ids.head(5)}", level=2)
+
+        # 檢查主檔案中的重複課程記錄
+        print_debug("檢查主檔案中的重複課程記錄...", level=2)
+        for dup_id in dup_student_ids.index[:3]:  # 只檢查前3個重複學號
+            dup_courses = df[df['學號'] == dup_id][['開課學年期', '課程代碼', '課程名稱']].drop_duplicates()
+            dup_count = len(dup_courses)
+            print_debug(f"學號 {dup_id} 修了 {dup_count} 門不同課程", level=2)
+            if dup_count <= 5:  # 如果課程數少於5，顯示詳細課程
+                print_debug(f"課程詳情：\n{dup_courses}", level=2)
+
+    # 輸出一些樣本進行對比檢查
+    print_debug(f"主檔案學號前10筆: {df['學號'].head(10).tolist()}", level=2)
+    print_debug(f"基本資料學號前10筆: {basic_df_selected['學號'].head(10).tolist()}", level=2)
+
+
+def merge_basic_data(df, basic_df_selected, progress=None):
+    """將處理過的基本資料依學號合併到主資料"""
+    print_debug(f"合併前資料筆數: 主檔案 {len(df)}, 基本資料 {len(basic_df_selected)}", level=1)
+
+    # 重複學號與樣本只用於診斷，關閉詳細訊息時完全不計算
+    if debug_enabled(2):
+        _debug_duplicate_ids(df, basic_df_selected)
+
+    _report(progress, "合併資料中...", 65)
+    df = pd.merge(df, basic_df_selected, on='學號', how='left')
+    print_debug(f"合併後資料筆數: {len(df)}", level=1)
+
+    # 檢查合併結果中學院欄位的非空值數量
+    non_null_count = df['學院'].notna().sum()
+    print_debug(f"合併後學院欄位非空值數量: {non_null_count} (佔比 {non_null_count/len(df)*100:.2f}%)", level=1)
+
+    print_debug(f"已成功合併基本資料檔案中的學院資訊，合併成功率: {non_null_count}/{len(df)} ({non_null_count/len(df)*100:.2f}%)", level=1)
+    return df
+
+
+def prepare_for_split(df, add_semester=False):
+    """移除姓名欄位並加上輔助的'學年度'欄
+
+    add_semester 為 True 時另外加上'學期'欄（例如 1101 的學期為 '1'），供更細的分割使用。
+    """
+    if '姓名' in df.columns:
+        df = df.drop(columns=['姓名'])
+        print_debug("已移除姓名欄位", level=1)
+    if add_semester:
+        df['學年度'], df['學期'] = derive_academic_year(df['開課學年期'], with_semester=True)
+    else:
+        df['學年度'] = derive_academic_year(df['開課學年期'])
+    return df
+
+
+def compute_column_widths(data_to_save):
+    """依前1000筆資料估算每個欄位的寬度"""
+    return estimate_column_widths(data_to_save, WIDTH_STYLE_SPLIT, sample_rows=WIDTH_SAMPLE_ROWS)
+
+
+def save_year_workbook(data_to_save, output_file_path, sheet_name, engine=ENGINE_OPENPYXL, cancel_event=None):
+    """將單一學年度資料儲存為 Excel，並自動調整欄位寬度"""
+    column_widths = compute_column_widths(data_to_save)
+    write_excel(data_to_save, output_file_path, sheet_name, column_widths, engine=engine,
+                cancel_event=cancel_event)
+
+
+def read_partition(path, text_columns):
+    """讀回暫存分割區 CSV"""
+    return pd.read_csv(path, dtype=text_columns, encoding='utf-8')
+
+
+def _tee_chunks(chunks, sidecar_writer):
+    """逐塊寫出 Excel 的同時寫入 Parquet 附屬檔"""
+    for chunk in chunks:
+        sidecar_writer.write(chunk)
+        yield chunk
+
+
+def write_year_partition(data, output_file_path, sheet_name, engine=ENGINE_OPENPYXL, sidecar=True,
+                         cancel_event=None):
+    """寫入單一學年度活頁簿，可在子程序中執行
+
+    data 可為 DataFrame，或 YearPartitionSinks.source() 返回的分割區描述。
+    使用低記憶體引擎時，分割區會以欄寬取樣加上分塊讀取的方式寫出，不需整份載入。
+    sidecar 為 True 時另外在活頁簿旁寫入同名的 Parquet 附屬檔，供後續工具快速載入。
+    cancel_event 只在目前程序內有效（子程序中為 None）。
+    """
+    if not isinstance(data, pd.DataFrame):
+        path, text_columns = data
+        if engine == ENGINE_WRITE_ONLY:
+            sample = pd.read_csv(path, dtype=text_columns, encoding='utf-8', nrows=WIDTH_SAMPLE_ROWS)
+            chunks = pd.read_csv(path, dtype=text_columns, encoding='utf-8',
+                                 chunksize=WRITE_CHUNK_ROWS)
+            sidecar_writer = SidecarChunkWriter(output_file_path) if sidecar else None
+            if sidecar_writer is not None:
+                chunks = _tee_chunks(chunks, sidecar_writer)
+            try:
+                write_excel(chunks, output_file_path, sheet_name,
+                            compute_column_widths(sample), engine=engine, cancel_event=cancel_event)
+            except ProcessingCancelled:
+                if sidecar_writer is not None:
+                    sidecar_writer.abort()
+                raise
+            if sidecar_writer is not None and sidecar_writer.close() is None:
+                print_debug(f"無法建立 Parquet 附屬檔，後續工具將改讀 Excel: {output_file_path}", level=2)
+            return output_file_path
+        data = read_partition(path, text_columns)
+    save_year_workbook(data, output_file_path, sheet_name, engine=engine, cancel_event=cancel_event)
+    check_cancelled(cancel_event)
+    if sidecar and write_sidecar(data, output_file_path) is None:
+        print_debug(f"無法建立 Parquet 附屬檔，後續工具將改讀 Excel: {output_file_path}", level=2)
+    return output_file_path
+
+
+def write_year_workbooks(jobs, max_workers=DEFAULT_WRITER_WORKERS, progress=None,
+                         engine=ENGINE_OPENPYXL, sidecar=True, cancel_event=None):
+    """平行寫入各學年度活頁簿
+
+    jobs 為 (學年度, 資料或分割區描述, 輸出路徑, 工作表名稱) 的列表。
+    每完成一個學年度即回報進度（75% 到 95%），返回依完成順序排列的學年度。
+    取消時尚未開始的學年度不再寫入，並拋出 ProcessingCancelled；
+    平行寫入時已在子程序中執行的學年度會先完成。
+    """
+    total_years = len(jobs)
+    completed_years = []
+    if total_years == 0:
+        return completed_years
+
+    def report_done(year_group):
+        completed_years.append(year_group)
+        done = len(completed_years)
+        _report(progress, f"已儲存 {year_group} 學年度資料 ({done}/{total_years})...",
+                75 + done / total_years * 20)
+
+    max_workers = max(1, min(max_workers, total_years))
+    if max_workers == 1:
+        # 單一程序時直接在目前程序寫入，省去傳遞資料的成本
+        for year_group, data, output_file_path, sheet_name in jobs:
+            check_cancelled(cancel_event)
+            _report(progress, f"儲存 {year_group} 學年度資料到 Excel...")
+            write_year_partition(data, output_file_path, sheet_name, engine, sidecar, cancel_event)
+            report_done(year_group)
+        return completed_years
+
+    print_debug(f"使用 {max_workers} 個程序平行寫入 {total_years} 個學年度", level=1)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(write_year_partition, data, output_file_path, sheet_name, engine, sidecar): year_group
+            for year_group, data, output_file_path, sheet_name in jobs
+        }
+        pending = set(futures)
+        while pending:
+            # 定時喚醒以檢查是否已要求取消
+            done, pending = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            for future in done:
+                future.result()  # 子程序中的錯誤在此重新拋出
+                report_done(futures[future])
+            if cancel_event is not None and cancel_event.is_set():
+                for future in pending:
+                    future.cancel()
+                check_cancelled(cancel_event)
+    return completed_years
+
+
+def summarize_year_partitions(jobs, rules, engine=ENGINE_OPENPYXL, progress=None, cancel_event=None):
+    """直接由各學年度資料建立學生成績彙整（即 02_Filter 的處理），不寫出學年度課程資料活頁簿
+
+    jobs 同 write_year_workbooks；每個學年度寫出'_處理結果.xlsx'與 Parquet 附屬檔，
+    位置與名稱和 02 處理學年度活頁簿的結果相同。每完成一個學年度即回報進度（75% 到 95%），返回輸出路徑列表。
+    """
+    total_years = len(jobs)
+    output_paths = []
+    for index, (year_group, data, output_file_path, _) in enumerate(jobs, 1):
+        check_cancelled(cancel_event)
+        _report(progress, f"彙整 {year_group} 學年度學生成績...")
+        if not isinstance(data, pd.DataFrame):
+            # 串流模式的暫存分割區一次只讀入一個學年度
+            data = apply_course_schema(read_partition(*data))
+        # 記憶體中的學號為文字（見 STUDENT_ID_DTYPE），02 由學年度活頁簿讀回時則為整數；
+        # 先以相同方式解析，彙整表的學號儲存格型態與排序才會和兩步驟處理的結果一致
+        student_ids = excel_equivalent(data[[STUDENT_ID_COLUMN]])[STUDENT_ID_COLUMN]
+        data = data.assign(**{STUDENT_ID_COLUMN: student_ids.to_numpy()})
+        output_paths.append(write_student_summary(data, result_path_for(output_file_path), engine,
+                                                  cancel_event=cancel_event, rules=rules))
+        _report(progress, f"已彙整 {year_group} 學年度學生成績 ({index}/{total_years})...",
+                75 + index / total_years * 20)
+    return output_paths
+
+
+class YearPartitionSinks:
+    """依學年度分塊附加寫入的暫存分割區
+
+    每個學年度對應一個暫存 CSV 檔，分塊讀入的資料依學年度附加寫入，
+    讓記憶體用量只取決於分塊大小而非整個檔案大小。
+    """
+
+    def __init__(self, sink_dir):
+        self.sink_dir = sink_dir
+        self.paths = OrderedDict()
+        self.row_counts = {}
+        self.text_columns = None
+
+    def append(self, chunk):
+        """將含有'學年度'欄的資料塊附加到各學年度分割區"""
+        if self.text_columns is None:
+            # 記錄文字欄位，讀回時維持字串型別（例如已轉成字串的學號）
+            self.text_columns = {col: str for col, dtype in chunk.dtypes.items()
+                                 if col != '學年度' and not pd.api.types.is_numeric_dtype(dtype)}
+        for year_group, part in chunk.groupby('學年度', sort=False):
+            path = self.paths.get(year_group)
+            is_new = path is None
+            if is_new:
+                path = os.path.join(self.sink_dir, f"partition_{len(self.paths)}.csv")
+                self.paths[year_group] = path
+                self.row_counts[year_group] = 0
+            part.drop(columns=['學年度']).to_csv(path, mode='a', header=is_new,
+                                                index=False, encoding='utf-8')
+            self.row_counts[year_group] += len(part)
+
+    def years(self):
+        """返回已寫入的學年度（依名稱排序，與 groupby 的順序一致）"""
+        return sorted(self.paths)
+
+    def source(self, year_group):
+        """返回可交給其他程序讀取的分割區描述 (路徑, 文字欄位型別)"""
+        return self.paths[year_group], self.text_columns
+
+    def fingerprint(self, year_group):
+        """返回單一學年度分割區的 (筆數, 內容雜湊)"""
+        return partition_fingerprint(self.source(year_group), self.row_counts[year_group])
+
+    def read(self, year_group):
+        """讀回單一學年度的完整資料"""
+        return read_partition(*self.source(year_group))
+
+    def cleanup(self):
+        """刪除暫存分割區"""
+        shutil.rmtree(self.sink_dir, ignore_errors=True)
+
+
+def stream_csv_to_partitions(file_path, sink_dir, basic_df_selected=None,
+                             chunksize=CSV_CHUNK_SIZE, progress=None, cancel_event=None):
+    """分塊讀取主CSV檔案，逐塊合併基本資料、計算學年度並寫入各學年度分割區
+
+    進度回報範圍為 35% 到 70%，依已讀取的位元組數估算。每一塊之間檢查是否已要求取消。
+    """
+    sinks = YearPartitionSinks(sink_dir)
+    file_size = max(os.path.getsize(file_path), 1)
+    total_rows = 0
+
+    with open(file_path, 'rb') as fh:
+        reader = pd.read_csv(fh, chunksize=chunksize, dtype=STUDENT_ID_DTYPE)
+        for chunk_index, chunk in enumerate(reader):
+            check_cancelled(cancel_event)
+            if chunk_index == 0:
+                print_debug(lambda: f"主檔案欄位: {chunk.columns.tolist()}", level=2)
+                check_main_columns(chunk.columns)
+
+            if basic_df_selected is not None:
+                chunk = merge_basic_data(chunk, basic_df_selected)
+            chunk = prepare_for_split(chunk)
+            sinks.append(chunk)
+
+            total_rows += len(chunk)
+            _report(progress, f"已分塊讀取 {total_rows:,} 筆資料...",
+                    35 + min(fh.tell() / file_size, 1.0) * 35)
+
+    if sinks.text_columns is None:
+        raise pd.errors.EmptyDataError("檔案是空的！")
+
+    print_debug(f"分塊讀取完成，共 {total_rows} 筆資料，{len(sinks.paths)} 個學年度", level=1)
+    return sinks
+
+
+def _fingerprint_values(column):
+    """將欄位轉為與記憶體型態無關的值，供計算內容雜湊
+
+    共用型態依整個主檔案決定（見 course_schema），新增學年度可能使其他學年度的同一欄在
+    category/文字、float32/float64 之間改變；分類欄位還原為原本的值，數值欄位一律轉為 float64。
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        column = column.astype(column.cat.categories.dtype)
+    if pd.api.types.is_bool_dtype(column.dtype):
+        return column.astype(object)
+    if pd.api.types.is_numeric_dtype(column.dtype):
+        return column.astype(np.float64)
+    return column.astype(object)
+
+
+def partition_fingerprint(data, row_count=None):
+    """計算學年度資料的 (筆數, 內容雜湊)，用於判斷與先前輸出是否相同
+
+    data 為 DataFrame 時依欄位名稱與各欄的值計算，不受記憶體型態影響（見 _fingerprint_values）；
+    為暫存分割區描述時直接計算分割區檔案內容，筆數由 row_count 提供。
+    兩種方式的雜湊值不會相同，切換串流模式後會重新寫入所有學年度。
+    """
+    digest = hashlib.sha1()
+    if isinstance(data, pd.DataFrame):
+        digest.update(b"frame\0")
+        digest.update(repr([str(col) for col in data.columns]).encode('utf-8'))
+        values = pd.DataFrame({idx: _fingerprint_values(data[col]) for idx, col in enumerate(data.columns)})
+        digest.update(pd.util.hash_pandas_object(values, index=False).to_numpy().tobytes())
+        return len(data), digest.hexdigest()
+
+    path, _ = data
+    digest.update(b"partition\0")
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1024 * 1024), b''):
+            digest.update(block)
+    return row_count, digest.hexdigest()
+
+
+def load_manifest(output_folder):
+    """讀取輸出資料夾中的輸出清單，不存在或格式不符時返回 None"""
+    manifest_path = os.path.join(output_folder, MANIFEST_NAME)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def write_manifest(output_folder, years, engine, sidecar=True):
+    """寫入輸出清單，記錄各學年度的筆數、內容雜湊與輸出檔案"""
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec='seconds'),
+        "engine": engine,
+        "sidecar": sidecar,
+        "years": years,
+    }
+    manifest_path = os.path.join(output_folder, MANIFEST_NAME)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest_path
+
+
+def find_latest_output(parent_dir, exclude=None):
+    """在指定目錄中尋找最新一個含有輸出清單的'處理結果_時間戳'資料夾"""
+    candidates = []
+    for name in os.listdir(parent_dir):
+        folder = os.path.join(parent_dir, name)
+        if (name.startswith("處理結果_") and os.path.isdir(folder)
+                and folder != exclude and os.path.exists(os.path.join(folder, MANIFEST_NAME))):
+            candidates.append(name)
+    if not candidates:
+        return None
+    return os.path.join(parent_dir, max(candidates))  # 時間戳格式可直接依名稱排序
+
+
+def _link_or_copy(source, destination):
+    """以硬連結沿用檔案，無法建立硬連結（例如跨磁碟）時改為複製"""
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def plan_incremental_outputs(write_jobs, fingerprints, previous_folder, output_folder,
+                             engine, sidecar=True):
+    """比對先前的輸出清單，沿用未變更的學年度檔案
+
+    write_jobs 與 fingerprints 依學年度對應。返回 (仍需寫入的工作, 沿用的學年度, 新輸出清單的學年度項目)。
+    輸出引擎或附屬檔設定不同時，所有學年度都會重新寫入。
+    """
+    manifest = load_manifest(previous_folder) if previous_folder else None
+    previous_years = {}
+    if manifest is None:
+        if previous_folder:
+            print_debug(f"找不到可用的輸出清單，將完整處理: {previous_folder}", level=1)
+    elif manifest.get("engine") != engine or manifest.get("sidecar") != sidecar:
+        print_debug("輸出引擎或附屬檔設定與先前不同，將完整處理", level=1)
+    else:
+        previous_years = manifest.get("years", {})
+
+    pending_jobs = []
+    reused_years = []
+    manifest_years = {}
+    for job in write_jobs:
+        year_group, _, output_file_path, _ = job
+        rows, content_hash = fingerprints[year_group]
+        relative_path = os.path.relpath(output_file_path, output_folder)
+        files = [relative_path]
+        if sidecar:
+            files.append(os.path.splitext(relative_path)[0] + SIDECAR_SUFFIX)
+        manifest_years[year_group] = {"rows": rows, "hash": content_hash, "files": files}
+
+        previous = previous_years.get(year_group)
+        if (previous is not None and previous.get("rows") == rows
+                and previous.get("hash") == content_hash
+                and os.path.exists(os.path.join(previous_folder, previous["files"][0]))):
+            for relative_file in previous["files"]:
+                source = os.path.join(previous_folder, relative_file)
+                if os.path.exists(source):
+                    destination = os.path.join(output_folder, relative_file)
+                    os.makedirs(os.path.dirname(destination), exist_ok=True)
+                    _link_or_copy(source, destination)
+            manifest_years[year_group]["files"] = previous["files"]
+            reused_years.append(year_group)
+            print_debug(f"{year_group} 學年度資料未變更，沿用先前的輸出", level=1)
+        else:
+            pending_jobs.append(job)
+
+    return pending_jobs, reused_years, manifest_years
+
+
+def create_partition_dir(main_output_path):
+    """在輸出資料夾內建立暫存分割區資料夾"""
+    return tempfile.mkdtemp(prefix=".partitions_", dir=main_output_path)
+
+
+def run_split(file_path, basic_data_path=None, output_dir=None, max_workers=DEFAULT_WRITER_WORKERS,
+              stream=False, engine=ENGINE_OPENPYXL, incremental=False, previous_output=None,
+              progress=None, cancel_event=None, student_store=STUDENT_STORE_ENABLED, summary_only=False):
+    """執行完整的學年度切割流程，供 GUI 與命令列共用
+
+    參數:
+        file_path: 主要檔案（CSV 或 Excel）
+        basic_data_path: 基本資料檔案，None 表示不合併學院資訊
+        output_dir: 建立'處理結果_時間戳'資料夾的目錄，預設為主要檔案所在目錄
+        max_workers: 平行寫入活頁簿的程序數
+        stream: 主要檔案為 CSV 時是否使用分塊串流模式
+        engine: Excel 輸出引擎
+        incremental: 是否沿用先前輸出中未變更的學年度
+        previous_output: 增量模式比對的先前輸出資料夾，預設為 output_dir 中最新的一個
+        progress: 進度回報函式 progress(狀態訊息, 進度百分比)
+        cancel_event: 取消處理的 threading.Event
+        student_store: 是否使用學生資料庫快取基本資料（見 load_student_dimension）
+        summary_only: 合併 02 的處理，直接由記憶體中的學年度資料輸出學生成績彙整，
+            不寫出學年度課程資料活頁簿（不支援增量更新，也不寫出 manifest.json）
+
+    返回 SplitResult。取消時刪除本次的輸出資料夾並拋出 ProcessingCancelled。
+    """
+    if not file_path.endswith(('.csv', '.xlsx', '.xls')):
+        raise InputFormatError("不支援的檔案格式！請選取 Excel 或 CSV 檔案。")
+
+    # 大型CSV可使用分塊串流模式，記憶體用量只取決於分塊大小
+    use_streaming = stream and file_path.endswith('.csv')
+    output_dir = output_dir or os.path.dirname(file_path)
+
+    # 合併流程先讀取課程分類規則，規則檔有誤時不必等到讀完主檔案才發現
+    rules = None
+    if summary_only:
+        try:
+            rules = load_course_rules()
+        except (FileNotFoundError, ValueError) as e:
+            raise InputFormatError(str(e)) from e
+    sinks = None
+    main_output_path = None
+    try:
+        _report(progress, "開始讀取主檔案...", 5)
+
+        # 讀取主檔案
+        df = None
+        if use_streaming:
+            print_debug(f"以分塊串流模式讀取CSV檔案: {file_path}", level=1)
+            _report(progress, "檢查主檔案欄位...", 10)
+            header_df = pd.read_csv(file_path, nrows=0)
+            print_debug(lambda: f"主檔案欄位: {header_df.columns.tolist()}", level=2)
+            columns = header_df.columns
+        else:
+            if file_path.endswith('.csv'):
+                print_debug(f"開始讀取CSV檔案: {file_path}", level=1)
+                _report(progress, "讀取CSV主檔案中...", 10)
+                df = cached_read(pd.read_csv, file_path, dtype=STUDENT_ID_DTYPE)
+            else:
+                print_debug(f"開始讀取Excel檔案: {file_path}", level=1)
+                _report(progress, "讀取Excel主檔案中...", 10)
+                df = cached_read(pd.read_excel, file_path, dtype=STUDENT_ID_DTYPE)
+
+            check_cancelled(cancel_event)
+            _report(progress, "檢查主檔案欄位...", 15)
+            print_debug(lambda: f"主檔案欄位: {df.columns.tolist()}", level=2)
+            df = compact_course_table(df, "主檔案")
+            columns = df.columns
+
+        check_main_columns(columns)
+
+        # 讀取並處理基本資料檔案
+        basic_df_selected = None
+        if basic_data_path:
+            try:
+                basic_df_selected = load_student_dimension(basic_data_path, progress=progress,
+                                                           use_store=student_store)
+                if df is not None:
+                    df = merge_basic_data(df, basic_df_selected, progress=progress)
+                    df = compact_course_table(df, "合併基本資料後")
+            except InputFormatError as e:
+                print_debug(str(e), level=1)
+                raise
+            except Exception as e:
+                error_msg = f"合併基本資料時發生錯誤：\n{str(e)}"
+                print_debug(f"錯誤: {error_msg}", level=1)
+                print_debug(f"錯誤詳情: {type(e).__name__}", level=1)
+                import traceback
+                print_debug(traceback.format_exc, level=2)
+                raise BasicDataError(error_msg) from e
+
+        check_cancelled(cancel_event)
+
+        # 建立帶時間戳的主輸出資料夾
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        main_output_folder_name = f"處理結果_{timestamp}"
+        main_output_path = os.path.join(output_dir, main_output_folder_name)
+        os.makedirs(main_output_path, exist_ok=True)
+
+        if use_streaming:
+            # 逐塊合併、計算學年度並寫入各學年度暫存分割區
+            _report(progress, "分塊讀取主檔案並依學年度分割...", 35)
+            sinks = stream_csv_to_partitions(
+                file_path, create_partition_dir(main_output_path),
+                basic_df_selected=basic_df_selected, progress=progress,
+                cancel_event=cancel_event
+            )
+            year_groups = sinks.years()
+            # 子程序直接讀取暫存分割區，不需在程序間傳遞整份資料
+            get_year_data = sinks.source
+        else:
+            # 移除姓名欄位並計算學年度
+            _report(progress, "處理學年度資料...", 70)
+            df = prepare_for_split(df)
+            check_cancelled(cancel_event)
+            grouped = df.groupby('學年度')
+            year_groups = list(grouped.groups)
+
+            def get_year_data(year_group):
+                return grouped.get_group(year_group).drop(columns=['學年度']) # 儲存前移除輔助的'學年度'欄
+
+        # 計算總學年度數量用於進度條
+        total_years = len(year_groups)
+        _report(progress, f"開始依學年度處理資料，共 {total_years} 個學年度...", 75)
+
+        write_jobs = []
+        for year_group in year_groups:
+            # 將學年度資料夾建立在時間戳資料夾內
+            academic_year_folder_name, file_basename, sheet_name = get_year_output_names(year_group)
+            full_academic_year_folder_path = os.path.join(main_output_path, academic_year_folder_name)
+            os.makedirs(full_academic_year_folder_path, exist_ok=True)
+            output_file_path = os.path.join(full_academic_year_folder_path, file_basename)
+            write_jobs.append((year_group, get_year_data(year_group), output_file_path, sheet_name))
+
+        print_debug(f"Excel 輸出引擎: {engine}", level=2)
+
+        if summary_only:
+            if incremental:
+                print_debug("合併流程不支援增量更新，將重新處理所有學年度", level=1)
+            summarize_year_partitions(write_jobs, rules, engine=engine, progress=progress, cancel_event=cancel_event)
+            processed_years = list(year_groups)
+            _report(progress, "完成！", 100)
+            print_debug(f"學生成績彙整完成！已處理學年度：{', '.join(processed_years)}\n資料已存至資料夾：{main_output_path}", level=1)
+            return SplitResult(main_output_path, processed_years, [])
+
+        # 計算各學年度的筆數與內容雜湊，增量模式下沿用先前輸出中未變更的學年度
+        _report(progress, "計算各學年度資料的內容雜湊...", 75)
+        fingerprints = {}
+        for year_group, year_data, _, _ in write_jobs:
+            check_cancelled(cancel_event)
+            fingerprints[year_group] = sinks.fingerprint(year_group) if use_streaming else partition_fingerprint(year_data)
+        previous_folder = None
+        if incremental:
+            previous_folder = previous_output or find_latest_output(output_dir, exclude=main_output_path)
+            print_debug(f"增量模式，比對先前的輸出資料夾: {previous_folder}", level=1)
+        write_jobs, reused_years, manifest_years = plan_incremental_outputs(
+            write_jobs, fingerprints, previous_folder, main_output_path, engine
+        )
+
+        # 各學年度活頁簿以程序池平行寫入，每完成一個學年度即更新進度
+        write_year_workbooks(write_jobs, max_workers=max_workers, progress=progress,
+                             engine=engine, cancel_event=cancel_event)
+        write_manifest(main_output_path, manifest_years, engine)
+        processed_years = list(year_groups)
+
+        _report(progress, "完成！", 100)
+        if processed_years:
+            if reused_years:
+                print_debug(f"沿用先前輸出的學年度：{', '.join(reused_years)}", level=1)
+            print_debug(f"檔案處理完成！已成功處理學年度：{', '.join(processed_years)}\n資料已存至資料夾：{main_output_path}", level=1)
+        else:
+            print_debug("沒有可處理的資料或學年度。", level=1)
+        return SplitResult(main_output_path, processed_years, reused_years)
+
+    except (ProcessingCancelled, KeyboardInterrupt):
+        # 刪除本次建立的輸出資料夾，避免留下不完整的結果
+        if main_output_path and os.path.isdir(main_output_path):
+            shutil.rmtree(main_output_path, ignore_errors=True)
+            print_debug(f"已取消處理並刪除未完成的輸出：{main_output_path}", level=1)
+        raise
+    finally:
+        # 清除串流模式的暫存分割區
+        if sinks is not None:
+            sinks.cleanup()
+
+
+def _print_progress(status_message, progress_value=None):
+    """命令列模式的進度輸出"""
+    if progress_value is None:
+        print_debug(status_message, level=2)
+    else:
+        print_debug(f"[{progress_value:5.1f}%] {status_message}", level=1)
+
+
+def main(argv=None):
+    """命令列進入點，不需要 tkinter 與顯示器，可供排程批次執行"""
+    parser = argparse.ArgumentParser(description="依學年度切割課程資料（命令列版本，不啟動 GUI）")
+    parser.add_argument("main_file", help="主要檔案（CSV 或 Excel）")
+    parser.add_argument("--basic", dest="basic_file", help="學生基本資料檔案（CSV 或 Excel）")
+    parser.add_argument("--output-dir", help="建立'處理結果_時間戳'資料夾的目錄，預設為主要檔案所在目錄")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WRITER_WORKERS,
+                        help=f"平行寫入活頁簿的程序數（預設 {DEFAULT_WRITER_WORKERS}）")
+    parser.add_argument("--stream", action="store_true", help="大型CSV使用分塊串流模式")
+    parser.add_argument("--engine", choices=[ENGINE_OPENPYXL, ENGINE_WRITE_ONLY], default=ENGINE_OPENPYXL,
+                        help="Excel 輸出引擎")
+    parser.add_argument("--incremental", action="store_true", help="沿用先前輸出中未變更的學年度")
+    parser.add_argument("--previous-output", help="增量模式比對的先前輸出資料夾，預設為最新的一個")
+    parser.add_argument("--no-student-store", dest="student_store", action="store_false",
+                        default=STUDENT_STORE_ENABLED, help="不使用學生資料庫，每次重新解析基本資料檔案")
+    parser.add_argument("--summary-only", action="store_true",
+                        help="合併 02 的處理，只輸出各學年度的學生成績彙整（不寫出學年度課程資料活頁簿）")
+    parser.add_argument("--debug-level", type=int, choices=[0, 1, 2],
+                        help="輸出訊息的詳細程度：0=無輸出，1=重要訊息，2=詳細訊息")
+    args = parser.parse_args(argv)
+
+    if args.debug_level is not None:
+        global DEBUG_LEVEL
+        DEBUG_LEVEL = args.debug_level
+
+    try:
+        result = run_split(
+            args.main_file, args.basic_file, output_dir=args.output_dir,
+            max_workers=max(1, args.workers), stream=args.stream, engine=args.engine,
+            incremental=args.incremental, previous_output=args.previous_output,
+            progress=_print_progress, student_store=args.student_store, summary_only=args.summary_only,
+        )
+    except KeyboardInterrupt:
+        flush_logs()
+        print("已中斷處理", file=sys.stderr)
+        return 130
+    except (InputFormatError, BasicDataError, FileNotFoundError, pd.errors.EmptyDataError) as e:
+        flush_logs()
+        print(f"錯誤：{e}", file=sys.stderr)
+        return 1
+    # 先輸出背景執行緒中尚未寫出的診斷訊息，最後一行才是輸出資料夾
+    flush_logs()
+    print(result.output_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
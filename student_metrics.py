@@ -0,0 +1,94 @@
+"""
+學生彙整表的衍生指標
+由各課程類別的平均成績以欄位運算一次算出總體GPA、必修/選修平均等指標；
+02_Filter.py 將其寫入彙整表，03/04 直接讀取，舊版彙整表則於載入時補算
+"""
+
+import numpy as np
+import pandas as pd
+
+from course_schema import SUMMARY_SCORE_COLUMNS
+
+# 必修與選修、專業（一般）與通識包含的課程類別
+REQUIRED_COLUMNS = ('一般必修', '通識必修')
+ELECTIVE_COLUMNS = ('一般選修', '通識選修')
+MAJOR_COLUMNS = ('一般必修', '一般選修')
+LIBERAL_COLUMNS = ('通識必修', '通識選修')
+
+# 衍生指標欄位
+VALID_COUNT_COLUMN = '有效類別數'  # 有平均成績的課程類別數
+GPA_COLUMN = '總體GPA'  # 有成績的類別平均
+REQUIRED_MEAN_COLUMN = '必修平均'
+ELECTIVE_MEAN_COLUMN = '選修平均'
+GAP_COLUMN = '必選修差距'  # 必修平均 - 選修平均，任一方沒有成績時為空值
+MAX_SCORE_COLUMN = '最高類別成績'
+MIN_SCORE_COLUMN = '最低類別成績'
+METRIC_COLUMNS = (VALID_COUNT_COLUMN, GPA_COLUMN, REQUIRED_MEAN_COLUMN, ELECTIVE_MEAN_COLUMN, GAP_COLUMN,
+                  MAX_SCORE_COLUMN, MIN_SCORE_COLUMN)
+
+# 各課程類別的課程數與成績標準差欄位名稱的後綴，例如 '一般必修課程數'
+COURSE_COUNT_SUFFIX = '課程數'
+SCORE_STD_SUFFIX = '標準差'
+
+
+def course_count_column(category):
+    """某課程類別的課程數欄位名稱"""
+    return category + COURSE_COUNT_SUFFIX
+
+
+def score_std_column(category):
+    """某課程類別的成績標準差欄位名稱"""
+    return category + SCORE_STD_SUFFIX
+
+
+def score_matrix(df, columns):
+    """取出成績欄位為 (筆數, 欄位數) 的 float64 陣列，缺少的欄位與無法解析的值為 NaN"""
+    matrix = np.full((len(df), len(columns)), np.nan)
+    for idx, col in enumerate(columns):
+        if col in df.columns:
+            matrix[:, idx] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    return matrix
+
+
+def nan_row_mean(matrix):
+    """每列有值欄位的平均，整列皆為空值時為 NaN（不產生警告）"""
+    valid = ~np.isnan(matrix)
+    counts = valid.sum(axis=1)
+    totals = np.where(valid, matrix, 0.0).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, totals / counts, np.nan)
+
+
+def row_mean(df, columns):
+    """每位學生在指定類別中有成績者的平均（NumPy 欄位運算），返回與 df 相同索引的 Series，沒有任何成績時為 NaN"""
+    return pd.Series(nan_row_mean(score_matrix(df, columns)), index=df.index)
+
+
+def _nan_row_extreme(matrix, reducer, fill):
+    """每列有值欄位的最大或最小值，整列皆為空值時為 NaN"""
+    valid = ~np.isnan(matrix)
+    extreme = reducer(np.where(valid, matrix, fill), axis=1)
+    return np.where(valid.any(axis=1), extreme, np.nan)
+
+
+def derive_student_metrics(df, score_columns=SUMMARY_SCORE_COLUMNS):
+    """依各課程類別的平均成績計算衍生指標並加入 df（就地修改），返回 df"""
+    scores = score_matrix(df, score_columns)
+    required = nan_row_mean(score_matrix(df, REQUIRED_COLUMNS))
+    elective = nan_row_mean(score_matrix(df, ELECTIVE_COLUMNS))
+
+    df[VALID_COUNT_COLUMN] = (~np.isnan(scores)).sum(axis=1)
+    df[GPA_COLUMN] = nan_row_mean(scores)
+    df[REQUIRED_MEAN_COLUMN] = required
+    df[ELECTIVE_MEAN_COLUMN] = elective
+    df[GAP_COLUMN] = required - elective
+    df[MAX_SCORE_COLUMN] = _nan_row_extreme(scores, np.max, -np.inf)
+    df[MIN_SCORE_COLUMN] = _nan_row_extreme(scores, np.min, np.inf)
+    return df
+
+
+def student_metrics(df, score_columns=SUMMARY_SCORE_COLUMNS):
+    """確保彙整表帶有衍生指標欄位；02 輸出的彙整表已包含時直接返回，否則補算一次"""
+    if all(col in df.columns for col in METRIC_COLUMNS):
+        return df
+    return derive_student_metrics(df, score_columns)
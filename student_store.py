@@ -0,0 +1,238 @@
+"""
+學生資料維度表
+將基本資料檔案整理後的 學號/學院/附屬學院/學生系級 存入本機 SQLite 資料庫。各學號的資料只保存不重複的版本，
+匯入新的基本資料時只新增或更新內容有變更的學號；每份基本資料另記錄其學號順序與對應的版本，
+同一份基本資料再次使用時直接由資料庫載入，結果與直接讀取該檔案相同，不受其他基本資料影響。
+最久未使用的基本資料超過 STORE_MAX_ROSTERS 份時會被刪除，不再被引用的版本一併清除
+"""
+
+import datetime
+import os
+import sqlite3
+
+import pandas as pd
+
+from data_loader import file_identity
+
+# 資料庫設定，可用環境變數 AH_STUDENT_STORE_PATH 指定檔案位置，AH_STUDENT_STORE=0 停用
+STUDENT_STORE_ENABLED = os.environ.get("AH_STUDENT_STORE", "1") != "0"
+STUDENT_STORE_PATH = os.environ.get("AH_STUDENT_STORE_PATH") or os.path.join(
+    os.path.expanduser("~"), ".cache", "2025-AH_Program", "students.sqlite3")
+STORE_MAX_ROSTERS = 10  # 保留最近使用的基本資料份數
+
+# 資料表結構或基本資料的整理方式改變時遞增，舊的資料庫會被清空重建
+STORE_SCHEMA_VERSION = 4
+
+# 資料庫欄位與 DataFrame 欄位名稱的對應
+STORE_COLUMNS = {
+    "student_id": "學號",
+    "college": "學院",
+    "subsidiary_college": "附屬學院",
+    "student_level": "學生系級",
+}
+
+# 內容完全相同（空值也相同）的學號版本
+_SAME_VERSION = ("v.student_id = i.student_id AND v.college IS i.college"
+                 " AND v.subsidiary_college IS i.subsidiary_college AND v.student_level IS i.student_level")
+
+
+class StudentStore:
+    """學生資料維度表
+
+    student_versions 保存各學號不重複的資料版本，students 記錄每個學號最近一次匯入的版本；
+    rosters 與 roster_students 記錄每份基本資料的學號順序及其版本，供原樣載入。
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or STUDENT_STORE_PATH
+        folder = os.path.dirname(self.db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path)
+        self._ensure_schema()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _ensure_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        with self.conn:
+            if version != STORE_SCHEMA_VERSION:
+                for table in ("students", "rosters", "student_versions", "roster_students"):
+                    self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS student_versions ("
+                " version_id INTEGER PRIMARY KEY,"
+                " student_id TEXT NOT NULL,"
+                " college TEXT,"
+                " subsidiary_college TEXT NOT NULL DEFAULT '',"
+                " student_level TEXT)"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS student_versions_student_id ON student_versions (student_id)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS students ("
+                " student_id TEXT PRIMARY KEY,"
+                " version_id INTEGER NOT NULL,"
+                " updated_at TEXT NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS rosters ("
+                " roster_key TEXT PRIMARY KEY,"
+                " path TEXT NOT NULL,"
+                " student_count INTEGER NOT NULL,"
+                " has_subsidiary INTEGER NOT NULL,"
+                " imported_at TEXT NOT NULL,"
+                " last_used INTEGER NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS roster_students ("
+                " roster_key TEXT NOT NULL,"
+                " position INTEGER NOT NULL,"
+                " version_id INTEGER NOT NULL,"
+                " PRIMARY KEY (roster_key, position))"
+            )
+            self.conn.execute(f"PRAGMA user_version = {STORE_SCHEMA_VERSION}")
+
+    @staticmethod
+    def roster_key(roster_path):
+        """以路徑、檔案大小與修改時間識別基本資料檔案，不需讀取檔案內容"""
+        path, size, mtime_ns = file_identity(roster_path)
+        return f"{path}:{size}:{mtime_ns}"
+
+    def has_roster(self, roster_key):
+        """此基本資料檔案（roster_key() 的結果）是否已匯入過"""
+        row = self.conn.execute(
+            "SELECT 1 FROM rosters WHERE roster_key = ?", (roster_key,)
+        ).fetchone()
+        return row is not None
+
+    def _touch(self, roster_key):
+        """將基本資料標記為最近使用"""
+        self.conn.execute(
+            "UPDATE rosters SET last_used = (SELECT COALESCE(MAX(last_used), 0) + 1 FROM rosters)"
+            " WHERE roster_key = ?", (roster_key,))
+
+    def import_roster(self, roster_key, roster_path, basic_df):
+        """將整理後的基本資料匯入資料表，取代同一份基本資料先前的紀錄，返回新增或變更的學號數
+
+        basic_df 需含'學號'與'學院'欄，'附屬學院'與'學生系級'欄可有可無；學號不可重複。
+        只有資料庫中沒有相同內容的學號會新增版本；其他基本資料的學生不受影響。
+        """
+        def column_values(name, default=None):
+            if name not in basic_df.columns:
+                return [default] * len(basic_df)
+            values = basic_df[name].astype(object)
+            return values.where(values.notna(), default).tolist()
+
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+        rows = zip(
+            range(len(basic_df)),
+            basic_df['學號'].astype(str).tolist(),
+            column_values('學院'),
+            column_values('附屬學院', ''),
+            column_values('學生系級'),
+        )
+        with self.conn:
+            self.conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS incoming ("
+                " position INTEGER, student_id TEXT, college TEXT, subsidiary_college TEXT, student_level TEXT)"
+            )
+            self.conn.execute("DELETE FROM incoming")
+            self.conn.executemany("INSERT INTO incoming VALUES (?, ?, ?, ?, ?)", rows)
+
+            # 只新增資料庫中還沒有的學號版本
+            self.conn.execute(
+                "INSERT INTO student_versions (student_id, college, subsidiary_college, student_level)"
+                " SELECT i.student_id, i.college, i.subsidiary_college, i.student_level FROM incoming i"
+                f" WHERE NOT EXISTS (SELECT 1 FROM student_versions v WHERE {_SAME_VERSION}) ORDER BY i.position"
+            )
+            self.conn.execute("DELETE FROM roster_students WHERE roster_key = ?", (roster_key,))
+            self.conn.execute(
+                "INSERT INTO roster_students (roster_key, position, version_id)"
+                f" SELECT ?, i.position, v.version_id FROM incoming i JOIN student_versions v ON {_SAME_VERSION}",
+                (roster_key,))
+
+            # 維度表只更新版本有變更的學號
+            changes_before = self.conn.total_changes
+            self.conn.execute(
+                "INSERT INTO students (student_id, version_id, updated_at)"
+                " SELECT v.student_id, v.version_id, ? FROM roster_students r"
+                " JOIN student_versions v ON v.version_id = r.version_id WHERE r.roster_key = ?"
+                " ON CONFLICT (student_id) DO UPDATE SET version_id = excluded.version_id, updated_at = excluded.updated_at"
+                " WHERE students.version_id != excluded.version_id",
+                (now, roster_key))
+            changed = self.conn.total_changes - changes_before
+            self.conn.execute("DELETE FROM incoming")
+
+            self.conn.execute(
+                "INSERT OR REPLACE INTO rosters (roster_key, path, student_count, has_subsidiary, imported_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, 0)",
+                (roster_key, os.path.abspath(roster_path), len(basic_df),
+                 int('附屬學院' in basic_df.columns), now),
+            )
+            self._touch(roster_key)
+        return changed
+
+    def load(self, roster_key, with_level=False):
+        """載入某份基本資料的學生資料，學號順序與匯入時相同
+
+        返回 學號/學院 欄；該份基本資料含重複學號（整理後有'附屬學院'欄）時另含'附屬學院'欄，
+        with_level 為 True 時另含'學生系級'欄。
+        """
+        columns = ["student_id", "college"]
+        row = self.conn.execute(
+            "SELECT has_subsidiary FROM rosters WHERE roster_key = ?", (roster_key,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"學生資料庫中沒有此基本資料：{roster_key}")
+        if row[0]:
+            columns.append("subsidiary_college")
+        if with_level:
+            columns.append("student_level")
+        df = pd.read_sql_query(
+            f"SELECT {', '.join('v.' + col for col in columns)} FROM roster_students r"
+            " JOIN student_versions v ON v.version_id = r.version_id"
+            " WHERE r.roster_key = ? ORDER BY r.position",
+            self.conn, params=(roster_key,))
+        with self.conn:
+            self._touch(roster_key)
+        return df.rename(columns=STORE_COLUMNS)
+
+    def prune(self, max_rosters=STORE_MAX_ROSTERS):
+        """只保留最近使用的 max_rosters 份基本資料，並刪除不再被引用的學號版本，返回刪除的基本資料份數"""
+        with self.conn:
+            stale = [key for (key,) in self.conn.execute(
+                "SELECT roster_key FROM rosters ORDER BY last_used DESC LIMIT -1 OFFSET ?", (max_rosters,))]
+            if not stale:
+                return 0
+            self.conn.executemany("DELETE FROM roster_students WHERE roster_key = ?", [(key,) for key in stale])
+            self.conn.executemany("DELETE FROM rosters WHERE roster_key = ?", [(key,) for key in stale])
+            self.conn.execute(
+                "DELETE FROM student_versions WHERE version_id NOT IN (SELECT version_id FROM roster_students)"
+                " AND version_id NOT IN (SELECT version_id FROM students)"
+            )
+        return len(stale)
+
+    def roster_count(self):
+        """資料庫中保存的基本資料份數"""
+        return self.conn.execute("SELECT COUNT(*) FROM rosters").fetchone()[0]
+
+    def student_count(self, roster_key=None):
+        """維度表中的學號數；指定 roster_key 時只計該份基本資料"""
+        if roster_key is None:
+            return self.conn.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM roster_students WHERE roster_key = ?", (roster_key,)
+        ).fetchone()[0]
+
+    def version_count(self):
+        """資料庫中保存的學號版本數"""
+        return self.conn.execute("SELECT COUNT(*) FROM student_versions").fetchone()[0]
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from course_schema import (
+    SUMMARY_SCHEMA_KEY, SUMMARY_SCHEMA_VERSION, SUMMARY_SCORE_COLUMNS, apply_summary_schema, summary_scores,
+)
+from filter_core import build_student_summary
+
+
+def test_summary_scores_are_float64_even_when_float32_is_lossless():
+    # 全部為 .0/.25/.5 的平均可以精確表示為 float32，仍須輸出 float64
+    df = pd.DataFrame({col: [80.0, 72.5, np.nan, 65.25] for col in SUMMARY_SCORE_COLUMNS})
+    df['一般必修'] = ['80', '72.5', '', 'x']
+    result = apply_summary_schema(df)
+    for col in SUMMARY_SCORE_COLUMNS:
+        assert result[col].dtype == np.float64
+    assert result['一般必修'].isna().tolist() == [False, False, True, True]
+    assert result.attrs[SUMMARY_SCHEMA_KEY] == SUMMARY_SCHEMA_VERSION
+
+
+def test_old_float32_summary_is_converted():
+    df = pd.DataFrame({col: np.array([80.0, 72.5], dtype=np.float32) for col in SUMMARY_SCORE_COLUMNS})
+    df.attrs[SUMMARY_SCHEMA_KEY] = 1
+    result = summary_scores(df)
+    assert all(result[col].dtype == np.float64 for col in SUMMARY_SCORE_COLUMNS)
+
+
+def test_student_summary_dtype_does_not_depend_on_data():
+    courses = pd.DataFrame({
+        '學院': ['理學院'] * 4,
+        '學生系級': ['物理一'] * 4,
+        '學號': [1001, 1001, 1002, 1002],
+        '課程代碼': ['PH100', 'GE101', 'PH100', 'GQ001'],
+        '課程名稱': ['普通物理', '英文', '普通物理', '語文與修辭'],
+        '必選修': ['必修', '選修', '必修', '必修'],
+        '成績': np.array([80.0, 72.5, 60.0, 90.0], dtype=np.float32),
+    })
+    summary = build_student_summary(courses)
+    for col in SUMMARY_SCORE_COLUMNS:
+        assert summary[col].dtype == np.float64
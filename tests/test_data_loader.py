@@ -0,0 +1,33 @@
+from data_loader import read_csv_sniffed, sniff_csv
+
+
+def _write(tmp_path, name, text, encoding="utf-8"):
+    path = tmp_path / name
+    path.write_text(text, encoding=encoding)
+    return str(path)
+
+
+def test_title_row_padded_with_delimiters_is_skipped(tmp_path):
+    path = _write(tmp_path, "roster.csv", "全校學籍資料,,\n學號,學院,姓名\n1001,理學院,王\n1002,工學院,李\n")
+    assert sniff_csv(path).header_row == 1
+    df = read_csv_sniffed(path, dtype={"學號": str})
+    assert list(df.columns) == ["學號", "學院", "姓名"]
+    assert df["學號"].tolist() == ["1001", "1002"]
+
+
+def test_short_title_row_and_sparse_data(tmp_path):
+    path = _write(tmp_path, "roster.csv", "學生基本資料\n學號,學院,姓名\n1001,理學院,\n1002,,李\n1003,工學院,張\n")
+    assert sniff_csv(path).header_row == 1
+    path = _write(tmp_path, "plain.csv", "學號,學院,姓名\n1001,理學院,\n1002,,李\n")
+    assert sniff_csv(path).header_row == 0
+
+
+def test_load_basic_data_with_padded_title_row(tmp_path, monkeypatch):
+    import data_loader
+    import split_core
+    monkeypatch.setattr(data_loader, "PARSE_CACHE_ENABLED", False)
+    path = _write(tmp_path, "basic.csv", "全校學籍資料,,\n學號,學院,姓名\n1001,理學院,王\n1002,工學院,李\n",
+                  encoding="utf-8-sig")
+    basic_df = split_core.load_basic_data(path)
+    assert basic_df["學號"].tolist() == ["1001", "1002"]
+    assert basic_df["學院"].tolist() == ["理學院", "工學院"]
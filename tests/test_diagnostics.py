@@ -0,0 +1,16 @@
+from diagnostics import flush_logs, get_logger
+
+
+def test_debug_log_file_only_written_at_level_2(tmp_path):
+    quiet_file = tmp_path / "level1.log"
+    quiet = get_logger("test_diagnostics_level1", log_file=str(quiet_file), debug_level=1)
+    quiet.info("info %s", 1)
+    quiet.warning("warning %s", 1)
+
+    verbose_file = tmp_path / "level2.log"
+    verbose = get_logger("test_diagnostics_level2", log_file=str(verbose_file), debug_level=2)
+    verbose.debug("debug %s", 2)
+    flush_logs()
+
+    assert not quiet_file.exists()
+    assert "debug 2" in verbose_file.read_text(encoding="utf-8")
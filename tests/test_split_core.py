@@ -0,0 +1,72 @@
+import pandas as pd
+
+from split_core import partition_fingerprint, run_split
+
+HEADER = "學號,姓名,開課學年期,課程代碼,課程名稱,必選修,學生系級,成績\n"
+
+
+def _course_rows(term, scores):
+    return "".join(f"{1100 + idx},學生{idx},{term},C{idx % 2},課程{idx % 2},必修,電機二,{score}\n"
+                   for idx, score in enumerate(scores))
+
+
+def _run(main_path, output_dir, **kwargs):
+    output_dir.mkdir()
+    return run_split(str(main_path), output_dir=str(output_dir), max_workers=1, student_store=False, **kwargs)
+
+
+def test_fingerprint_ignores_compacted_dtypes():
+    frame = pd.DataFrame({'課程名稱': ['微積分', '英文', '微積分'], '成績': [80.0, 75.5, 90.0]})
+    compact = frame.assign(課程名稱=frame['課程名稱'].astype('category'), 成績=frame['成績'].astype('float32'))
+    assert partition_fingerprint(frame) == partition_fingerprint(compact)
+    assert partition_fingerprint(frame) != partition_fingerprint(frame.assign(成績=[80.0, 75.5, 91.0]))
+
+
+def test_appending_a_year_reuses_unchanged_years(tmp_path, monkeypatch):
+    import data_loader
+    monkeypatch.setattr(data_loader, "PARSE_CACHE_ENABLED", False)
+    main_path = tmp_path / "main.csv"
+    main_path.write_text(HEADER + _course_rows("1111", [80, 75.5, 90, 62]) + _course_rows("1121", [70, 88, 91.5, 60]),
+                         encoding="utf-8-sig")
+    first = _run(main_path, tmp_path / "first")
+    assert first.reused_years == []
+
+    # 新學期的成績無法以 float32 精確表示，整個主檔案的成績欄改為 float64
+    with open(main_path, "a", encoding="utf-8") as fh:
+        fh.write(_course_rows("1131", [83.3, 77.7, 65.1, 92.2]))
+    second = _run(main_path, tmp_path / "second", incremental=True, previous_output=first.output_path)
+    assert sorted(second.reused_years) == sorted(first.processed_years)
+    assert len(second.processed_years) == len(first.processed_years) + 1
+
+
+def _cells(path):
+    from openpyxl import load_workbook
+    sheet = load_workbook(path, read_only=True).active
+    return [[(type(value).__name__, value) for value in row] for row in sheet.iter_rows(values_only=True)]
+
+
+def test_summary_only_matches_two_step_workbooks(tmp_path, monkeypatch):
+    import glob
+    import os
+
+    import data_loader
+    from filter_core import find_year_workbooks, summarize_workbook
+    monkeypatch.setattr(data_loader, "PARSE_CACHE_ENABLED", False)
+    main_path = tmp_path / "main.csv"
+    # 學號位數不同，以文字排序與以數值排序的結果不同
+    main_path.write_text(HEADER + "".join(f"{student_id},學生,1111,C{idx % 3},課程{idx % 3},{kind},電機二,{60 + idx}\n"
+                                          for idx, (student_id, kind) in enumerate(
+                                              [(901, "必修"), (1100, "選修"), (95, "必修"), (1100, "必修"),
+                                               (12000, "選修"), (901, "選修")])),
+                         encoding="utf-8-sig")
+    two_step = _run(main_path, tmp_path / "two_step")
+    for workbook in find_year_workbooks(two_step.output_path):
+        summarize_workbook(workbook)
+    fused = _run(main_path, tmp_path / "fused", summary_only=True)
+
+    expected = sorted(glob.glob(os.path.join(two_step.output_path, "*", "*_處理結果.xlsx")))
+    actual = sorted(glob.glob(os.path.join(fused.output_path, "*", "*_處理結果.xlsx")))
+    assert [os.path.relpath(p, two_step.output_path) for p in expected] == \
+        [os.path.relpath(p, fused.output_path) for p in actual]
+    for expected_path, actual_path in zip(expected, actual):
+        assert _cells(actual_path) == _cells(expected_path)
@@ -0,0 +1,78 @@
+import pandas as pd
+
+from student_store import StudentStore
+
+
+def _roster(tmp_path, name, df):
+    path = tmp_path / name
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def test_conflicting_rosters_load_back_unchanged(tmp_path):
+    roster_a = pd.DataFrame({
+        "學號": ["1001", "1002"],
+        "學院": ["理學院", "工學院"],
+        "附屬學院": ["", "理學院"],
+        "學生系級": ["物理一", "機械二"],
+    })
+    roster_b = pd.DataFrame({
+        "學號": ["1003", "1001"],
+        "學院": ["法學院", "商學院"],
+        "學生系級": ["法律一", None],
+    })
+    path_a = _roster(tmp_path, "a.csv", roster_a)
+    path_b = _roster(tmp_path, "b.csv", roster_b)
+
+    with StudentStore(str(tmp_path / "students.sqlite3")) as store:
+        key_a, key_b = store.roster_key(path_a), store.roster_key(path_b)
+        store.import_roster(key_a, path_a, roster_a)
+        store.import_roster(key_b, path_b, roster_b)
+        store.import_roster(key_a, path_a, roster_a)
+
+        assert store.has_roster(key_a) and store.has_roster(key_b)
+        pd.testing.assert_frame_equal(store.load(key_a, with_level=True), roster_a)
+        pd.testing.assert_frame_equal(store.load(key_b, with_level=True), roster_b)
+        # 只有含重複學號的基本資料才有附屬學院欄
+        assert list(store.load(key_a).columns) == ["學號", "學院", "附屬學院"]
+        assert list(store.load(key_b).columns) == ["學號", "學院"]
+        assert store.student_count(key_a) == 2
+        assert store.student_count(key_b) == 2
+
+
+def test_import_only_adds_changed_students(tmp_path):
+    roster_a = pd.DataFrame({"學號": ["1001", "1002", "1003"], "學院": ["理學院", "工學院", "法學院"]})
+    roster_b = roster_a.assign(學院=["理學院", "商學院", "法學院"])
+    path_a = _roster(tmp_path, "a.csv", roster_a)
+    path_b = _roster(tmp_path, "b.csv", roster_b)
+
+    with StudentStore(str(tmp_path / "students.sqlite3")) as store:
+        assert store.import_roster(store.roster_key(path_a), path_a, roster_a) == 3
+        assert store.import_roster(store.roster_key(path_b), path_b, roster_b) == 1
+        # 維度表每個學號一筆，只有變更的學號多出一個版本
+        assert store.student_count() == 3
+        assert store.version_count() == 4
+        pd.testing.assert_frame_equal(store.load(store.roster_key(path_a)), roster_a)
+        pd.testing.assert_frame_equal(store.load(store.roster_key(path_b)), roster_b)
+
+
+def test_prune_keeps_recently_used_rosters(tmp_path):
+    rosters = [pd.DataFrame({"學號": ["1001", "1002"], "學院": ["理學院", college]})
+               for college in ("工學院", "商學院", "法學院")]
+    paths = [_roster(tmp_path, f"{idx}.csv", roster) for idx, roster in enumerate(rosters)]
+
+    with StudentStore(str(tmp_path / "students.sqlite3")) as store:
+        keys = [store.roster_key(path) for path in paths]
+        for key, path, roster in zip(keys, paths, rosters):
+            store.import_roster(key, path, roster)
+        store.load(keys[0])  # 最早匯入的基本資料最近使用過
+
+        assert store.prune(max_rosters=2) == 1
+        assert store.roster_count() == 2
+        assert not store.has_roster(keys[1])
+        # 只被刪除的基本資料引用、也不是目前版本的'商學院'版本已清除
+        assert store.version_count() == 3
+        assert store.student_count() == 2
+        pd.testing.assert_frame_equal(store.load(keys[0]), rosters[0])
+        pd.testing.assert_frame_equal(store.load(keys[2]), rosters[2])
+        assert store.prune(max_rosters=2) == 0